@@ -2,21 +2,36 @@ from app.services.llm import LLMService
 from pathlib import Path
 from langgraph.graph import StateGraph
 from langgraph.checkpoint.memory import MemorySaver
-from typing import Dict, List, Any, Tuple
+from langgraph.checkpoint.sqlite.aio import AsyncSqliteSaver
+from langgraph.config import get_stream_writer
+from typing import Dict, List, Any, Tuple, AsyncIterator
 import json
+import hashlib
+import aiosqlite
 
 from app.services.summarizer import SummaryService
 from app.services.linkedin import LinkedInService
 from app.services.listing import PaperListingService
+from app.services.search import PaperSearchService
+from app.services.embeddings import EmbeddingService, build_embedder
+from app.services.fast_path import parse_date_range
 from app.services.database import DatabaseService
 from app.services.downloader import DownloaderService
 from app.services.intent_classifier import IntentClassifierService
 from app.models.agent import AgentState
-from datetime import datetime
+from datetime import date, datetime
 from app.config.logging import logger
-from langchain_core.messages import HumanMessage, AIMessage, SystemMessage
+from app.config.config import settings
+from langchain_core.messages import HumanMessage, AIMessage, AIMessageChunk, SystemMessage
 from langchain_core.prompts import ChatPromptTemplate
 from app.services.parameter_extractor import ParameterExtractorService
+from app.services.history import ConversationHistoryService
+from app.services.jobs import JobService
+from app.utils.utils import shutdown_extraction_pool
+from app.utils.prompts import prompt_registry
+
+# Graph nodes whose LLM output is the answer shown to the user
+TOKEN_STREAMING_NODES = {"general_chat", "create_linkedin_post_from_position", "modify_linkedin_post"}
 
 class ChatBotAgent:
     """Main agent orchestrating all services with database integration"""
@@ -31,11 +46,20 @@ class ChatBotAgent:
         self.intent_classifier = IntentClassifierService(self.llm_service)
         self.parameter_extractor_service = ParameterExtractorService(self.llm_service)
         self.downloader_service = DownloaderService()
-        self.summary_service = SummaryService(self.llm_service, self.database_service)
+        self.embedding_service = (
+            EmbeddingService(self.database_service, build_embedder(self.llm_service))
+            if settings.EMBEDDINGS_ENABLED else None
+        )
+        self.summary_service = SummaryService(self.llm_service, self.database_service, embedding_service=self.embedding_service)
         self.linkedin_service = LinkedInService(self.llm_service, self.database_service)
         self.listing_service = PaperListingService(self.database_service)
+        self.search_service = PaperSearchService(self.database_service)
+        self.history_service = ConversationHistoryService(self.llm_service)
+        self.job_service = JobService(self.downloader_service, self.summary_service)
 
+        # Replaced by the shared checkpointer in initialize() unless CHECKPOINTER is "memory"
         self.memory = MemorySaver()
+        self._checkpoint_conn = None
 
         self._setup_directories()
         self.graph = self._create_graph()
@@ -46,31 +70,61 @@ class ChatBotAgent:
         # await self.database_service.drop_tables()
         # await self.database_service.create_tables()
         print("Database connected and initialized")
+        logger.info(f"📝 Loaded {prompt_registry.load_all()} prompts")
+        await self._setup_checkpointer()
+        await self.llm_service.start()
+        if self.embedding_service:
+            await self.embedding_service.start()
+        await self.job_service.start()
     
     async def cleanup(self):
         """Cleanup database connections"""
+        await self.job_service.stop()
+        if self.embedding_service:
+            await self.embedding_service.stop()
+        await self.llm_service.stop()
         await self.database_service.disconnect()
+        if self._checkpoint_conn is not None:
+            await self._checkpoint_conn.close()
+        shutdown_extraction_pool()
+
+    async def _setup_checkpointer(self):
+        """Persist conversation state in SQLite so every worker process and restart sees the same threads"""
+        if settings.CHECKPOINTER != "sqlite":
+            return
+
+        Path(settings.CHECKPOINT_DB_PATH).parent.mkdir(parents=True, exist_ok=True)
+        self._checkpoint_conn = await aiosqlite.connect(settings.CHECKPOINT_DB_PATH)
+        await self._checkpoint_conn.execute("PRAGMA journal_mode=WAL")
+        await self._checkpoint_conn.execute("PRAGMA busy_timeout=5000")
+        self.memory = AsyncSqliteSaver(self._checkpoint_conn)
+        await self.memory.setup()
+        self.graph = self._create_graph()
+
+    def metrics(self) -> Dict[str, Any]:
+        """Runtime counters of the LLM backend, the intent classifier and the paper cache"""
+        return {
+            "llm": self.llm_service.stats(),
+            "intent_tiers": dict(self.intent_classifier.tier_counts),
+            "paper_cache": self.database_service.cache_stats(),
+        }
 
     def _setup_directories(self):
         """Create necessary directories"""
         Path("papers").mkdir(exist_ok=True)
         Path("summaries").mkdir(exist_ok=True)
 
-    def _get_history_and_user_input(self, state: AgentState):
-
-        role_map = {
-            SystemMessage: "System",
-            HumanMessage: "Human",
-            AIMessage: "Assistant",
-        }
-
+    async def _update_history(self, state: AgentState) -> Dict[str, Any]:
+        """Build the budgeted history for this turn and advance the running summary"""
         messages = state.get("messages", [])[:-1]
-
-        history = "\n".join(
-            f"{role_map.get(type(msg), 'Unknown')}: {msg.content}"
-            for msg in messages
+        history, summary, summarized_count = await self.history_service.build_history(
+            messages, state.get("history_summary"), state.get("history_summarized_count") or 0
         )
+        return {"history_context": history, "history_summary": summary, "history_summarized_count": summarized_count}
 
+    def _get_history_and_user_input(self, state: AgentState):
+        """Return the history built by _update_history for this turn and the latest user input"""
+        history = state.get("history_context") or ""
         user_input = state.get("messages", [])[-1].content if state.get("messages") else ""
 
         return history, user_input
@@ -83,8 +137,12 @@ class ChatBotAgent:
         graph.add_node("parameter_extractor", self._parameter_extractor_node)
         graph.add_node("summarize_papers", self._summarize_papers_node)
         graph.add_node("download_papers", self._download_papers_node)
+        graph.add_node("download_and_summarize_papers", self._download_and_summarize_papers_node)
+        graph.add_node("submit_summary_job", self._submit_summary_job_node)
         graph.add_node("create_linkedin_post_from_position", self._create_linkedin_post_by_position_node)
         graph.add_node("list_papers_by_date", self._list_papers_by_date_node)
+        graph.add_node("search_papers", self._search_papers_node)
+        graph.add_node("find_similar_papers", self._find_similar_papers_node)
         graph.add_node("general_chat", self._general_chat_node)
         graph.add_node("clarify_request", self._clarify_request_node)
         graph.add_node("modify_linkedin_post", self._modify_linkedin_post_node)
@@ -98,6 +156,8 @@ class ChatBotAgent:
                 "summarize": "parameter_extractor",
                 "linkedin by position": "parameter_extractor",
                 "list by date": "parameter_extractor",
+                "search": "parameter_extractor",
+                "similar": "parameter_extractor",
                 "modify linkedin": "modify_linkedin_post",
                 "general": "general_chat",
                 "clarify": "clarify_request",
@@ -109,23 +169,37 @@ class ChatBotAgent:
             "parameter_extractor",
             self._route_by_action,
             {
-                "summarize": "download_papers",
+                "summarize": self._summarize_entry_node(),
                 "linkedin by position": "create_linkedin_post_from_position",
                 "list": "list_papers_by_date",
+                "search": "search_papers",
+                "similar": "find_similar_papers",
                 "error": "__end__"
             }
         )
 
         graph.add_edge("download_papers", "summarize_papers")
         graph.add_edge("summarize_papers", "__end__")
+        graph.add_edge("download_and_summarize_papers", "__end__")
+        graph.add_edge("submit_summary_job", "__end__")
         graph.add_edge("create_linkedin_post_from_position", "__end__")
         graph.add_edge("modify_linkedin_post", "__end__")
         graph.add_edge("list_papers_by_date", "__end__")
+        graph.add_edge("search_papers", "__end__")
+        graph.add_edge("find_similar_papers", "__end__")
         graph.add_edge("general_chat", "__end__")
         graph.add_edge("clarify_request", "__end__")
 
         return graph.compile(checkpointer=self.memory)
     
+    def _summarize_entry_node(self) -> str:
+        """Pick the node that starts a summarize request"""
+        if settings.SUMMARIZE_IN_BACKGROUND:
+            return "submit_summary_job"
+        if settings.SUMMARY_STREAMING:
+            return "download_and_summarize_papers"
+        return "download_papers"
+    
     def _route_by_intent(self, state: AgentState) -> str:
         """Route based on classified intent"""
         intent = state.get("intent")
@@ -139,6 +213,10 @@ class ChatBotAgent:
             return "modify linkedin"
         elif intent == "list_papers_by_date":
             return "list by date"
+        elif intent == "search_papers":
+            return "search"
+        elif intent == "find_similar_papers":
+            return "similar"
         elif intent == "general_chat":
             return "general"
         elif intent == "need_clarification":
@@ -157,6 +235,10 @@ class ChatBotAgent:
             return "linkedin by position"
         elif intent == "list_papers_by_date":
             return "list"
+        elif intent == "search_papers":
+            return "search"
+        elif intent == "find_similar_papers":
+            return "similar"
         else:
             return "error"
         
@@ -164,11 +246,28 @@ class ChatBotAgent:
         """Classify user intent"""
         logger.info("Entered _intent_classifier_node")
 
+        user_input = state.get("messages", [])[-1].content if state.get("messages") else ""
+
+        fast_result = self.intent_classifier.classify_fast(user_input)
+        if fast_result:
+            intent, parameters = fast_result
+            return {**state, "intent": intent, "parameters": parameters}
+
+        # Only the LLM tiers need the conversation history
+        state = {**state, **await self._update_history(state)}
         history, user_input = self._get_history_and_user_input(state)
 
         try:
+            if settings.SINGLE_CALL_ROUTING:
+                single_call_result = await self.intent_classifier.classify_with_parameters(history, user_input)
+                if single_call_result:
+                    intent, parameters = single_call_result
+                    # Empty parameters are extracted again by the parameter extractor
+                    return {**state, "intent": intent, "parameters": parameters or None}
+
             intent = await self.intent_classifier.classify_intent(history, user_input)
-            return {**state, "intent": intent}
+            # Clear the previous turn's parameters so they are extracted again
+            return {**state, "intent": intent, "parameters": None}
         except Exception as e:
             return {**state, "error": f"Intent classification failed: {str(e)}"}
         
@@ -178,7 +277,7 @@ class ChatBotAgent:
         try:
             target_date = state.get("parameters", {}).get("target_date")
             # create folder if not exists
-            response = await self.downloader_service.download_papers(target_date)
+            response = await self.downloader_service.download_papers(target_date, progress_callback=get_stream_writer())
             logger.info(response)
             return {**state, "last_response": response}
         except Exception as e:
@@ -190,13 +289,47 @@ class ChatBotAgent:
         logger.info("Entered _summarize_papers_node")
         try:
             target_date = state.get("parameters", {}).get("target_date") or datetime.now().strftime("%Y-%m-%d")
-            processed_summary_ids, response_msg = await self.summary_service.summarize_papers_for_date(target_date)
+            force = str(state.get("parameters", {}).get("force", "")).lower() == "true"
+            processed_summary_ids, response_msg = await self.summary_service.summarize_papers_for_date(target_date, force=force, progress_callback=get_stream_writer())
 
             return {**state, "messages": [AIMessage(content=response_msg)], "current_papers": processed_summary_ids} 
         
         except Exception as e:
             return {**state, "error": f"Error summarizing papers: {str(e)}"}
         
+    async def _download_and_summarize_papers_node(self, state: AgentState) -> AgentState:
+        """Summarize each paper as soon as its download completes"""
+        logger.info("Entered _download_and_summarize_papers_node")
+        target_date = state.get("parameters", {}).get("target_date") or datetime.now().strftime("%Y-%m-%d")
+        force = str(state.get("parameters", {}).get("force", "")).lower() == "true"
+
+        try:
+            processed_summary_ids, response_msg = await self.summary_service.download_and_summarize_papers(
+                target_date, self.downloader_service, force=force, progress_callback=get_stream_writer()
+            )
+        except Exception as e:
+            logger.error(f"Error downloading and summarizing papers: {str(e)}")
+            return {**state, "error": f"Error downloading and summarizing papers: {str(e)}"}
+
+        return {**state, "messages": [AIMessage(content=response_msg)], "current_papers": processed_summary_ids}
+
+    async def _submit_summary_job_node(self, state: AgentState) -> AgentState:
+        """Queue downloading and summarizing as a background job"""
+        logger.info("Entered _submit_summary_job_node")
+        target_date = state.get("parameters", {}).get("target_date") or datetime.now().strftime("%Y-%m-%d")
+        force = str(state.get("parameters", {}).get("force", "")).lower() == "true"
+
+        try:
+            job = await self.job_service.submit("download_and_summarize", target_date, force=force)
+        except Exception as e:
+            return {**state, "error": f"Error submitting summary job: {str(e)}"}
+
+        response_msg = (
+            f"⏳ Summarizing papers for *{target_date}* in the background (job `{job.id}`, status: {job.status}). "
+            f"Ask me to list the papers for that date once it is done."
+        )
+        return {**state, "messages": [AIMessage(content=response_msg)]}
+
     async def _parameter_extractor_node(self, state: AgentState) -> AgentState:
         """Extract parameters from user input"""
         logger.info("Entered _parameter_extractor_node")
@@ -205,7 +338,8 @@ class ChatBotAgent:
         intent = state.get("intent")
 
         try:
-            parameters = await self.parameter_extractor_service.extract_parameters(history, user_input, intent)
+            # Parameters are already set when the fast path classified the input
+            parameters = state.get("parameters") or await self.parameter_extractor_service.extract_parameters(history, user_input, intent)
 
         except Exception as e:
             return {**state, "error": f"Error extracting parameters: {str(e)}"} 
@@ -218,7 +352,7 @@ class ChatBotAgent:
             if not parameters.get("month") or int(parameters.get("month")) > 12 or int(parameters.get("month")) < 1 or not parameters.get("day") or int(parameters.get("day")) > 31 or int(parameters.get("day")) < 1:
                 return {**state, "error": "Invalid date format. Please specify a year, a month, and a day.", "messages": [AIMessage(content="The date you've sent is invalid. Please specify a year, a month, and a day.")]}
             
-            target_date = f"{parameters['year']}-{parameters['month']}-{parameters['day']}" or datetime.now().strftime("%Y-%m-%d")
+            target_date = f"{int(parameters['year']):04d}-{int(parameters['month']):02d}-{int(parameters['day']):02d}"
             parameters["target_date"] = target_date
 
         logger.info(f"Parameters: {parameters}")
@@ -267,23 +401,88 @@ class ChatBotAgent:
         except Exception as e:
             return {**state, "error": f"Error listing papers: {str(e)}"}
 
-    async def _general_chat_node(self, state: AgentState) -> AgentState:
-        """Generate general chat response"""
-        logger.info(f"🤖 Entered General Response")
-        role_map = {
-            SystemMessage: "System",
-            HumanMessage: "Human",
-            AIMessage: "Assistant",
+    async def _search_papers_node(self, state: AgentState) -> AgentState:
+        """Search papers by topic, continuing the previous search for "next page" requests"""
+        logger.info("Entered _search_papers_node")
+
+        parameters = state.get("parameters") or {}
+        previous = state.get("current_search") or {}
+        query = str(parameters.get("query") or "").strip()
+        page = str(parameters.get("page") or "1").strip().lower()
+
+        if page == "next":
+            if not previous:
+                return {**state, "messages": [AIMessage(content="There is no previous search to continue. What topic should I search for?")]}
+            search = {**previous, "page": previous["page"] + 1}
+            if query and query != previous["query"]:
+                search = {**search, "query": query, "page": 1}
+            elif "pages" in previous and previous["page"] >= previous["pages"]:
+                return {**state, "messages": [AIMessage(
+                    content=f"That was the last page of papers matching *{previous['query']}*."
+                )]}
+        else:
+            since, until = parameters.get("since"), parameters.get("until")
+            if not since:
+                found = parse_date_range(str(parameters.get("date_description") or ""))
+                if found:
+                    since, until = found[0].isoformat(), found[1].isoformat()
+            search = {"query": query, "page": max(1, int(page)) if page.isdigit() else 1, "since": since, "until": until}
+
+        if not search["query"]:
+            return {**state, "messages": [AIMessage(content="What topic should I search for?")]}
+
+        try:
+            paper_ids, response_msg, shown_page, pages = await self.search_service.search_papers(
+                search["query"],
+                page=search["page"],
+                since=date.fromisoformat(search["since"]) if search.get("since") else None,
+                until=date.fromisoformat(search["until"]) if search.get("until") else None
+            )
+        except Exception as e:
+            return {**state, "error": f"Error searching papers: {str(e)}"}
+
+        # Keep the previous list when nothing matched so positional requests still work
+        return {
+            **state,
+            "messages": [AIMessage(content=response_msg)],
+            "current_papers": paper_ids or state.get("current_papers"),
+            "current_search": {**search, "page": shown_page, "pages": pages},
         }
 
-        messages = state.get("messages", [])[:-1] 
+    async def _find_similar_papers_node(self, state: AgentState) -> AgentState:
+        """List the stored papers closest to a listed paper by abstract embedding"""
+        logger.info("Entered _find_similar_papers_node")
+        if not self.embedding_service:
+            return {**state, "error": "Similar-paper lookup is disabled"}
 
-        history = "\n".join(
-            f"{role_map.get(type(msg), 'Unknown')}: {msg.content}"
-            for msg in messages
-        )
+        try:
+            position = int(state.get("parameters", {}).get("paper_position"))
+            paper_id = int(state.get("current_papers", [])[position-1])
+        except (TypeError, ValueError, IndexError):
+            return {**state, "messages": [AIMessage(content="Which paper? List or search papers first, then refer to one by its number.")]}
+
+        try:
+            matches = await self.embedding_service.similar_papers(paper_id, settings.SIMILAR_PAPERS_K)
+            titles = await self.database_service.get_paper_titles([paper_id] + [match_id for match_id, _ in matches])
+        except Exception as e:
+            return {**state, "error": f"Error finding similar papers: {str(e)}"}
+
+        # Papers deleted since they were embedded have no title
+        matches = [(match_id, similarity) for match_id, similarity in matches if match_id in titles]
+        if not matches:
+            return {**state, "messages": [AIMessage(content="No similar papers found.")]}
+
+        response_msg = f"\n\nPapers similar to *{titles.get(paper_id, f'paper {position}')}*:"
+        for idx, (match_id, similarity) in enumerate(matches, start=1):
+            response_msg += f"\n{idx}. {titles[match_id]} (similarity {similarity:.2f})"
+
+        return {**state, "messages": [AIMessage(content=response_msg)], "current_papers": [match_id for match_id, _ in matches]}
+
+    async def _general_chat_node(self, state: AgentState) -> AgentState:
+        """Generate general chat response"""
+        logger.info(f"🤖 Entered General Response")
+        history, user_input = self._get_history_and_user_input(state)
         logger.info(f"History: {history}")
-        user_input = state.get("messages", [])[-1].content if state.get("messages") else ""
         logger.info(f"User input: {user_input}")
         prompt = ChatPromptTemplate.from_messages([
             SystemMessage(content="""You are a helpful research paper assistant with memory of previous conversations.
@@ -315,29 +514,67 @@ Could you clarify what you'd like me to do?"""
         
         return {**state, "messages": [AIMessage(content=response_msg)]}
 
-    async def process_user_input(self, user_input: str, session_id: str) -> str:
-        """Process user input through the conversational workflow"""
+    def _thread_config(self, session_id: str) -> Dict[str, Any]:
         thread_id = session_id_to_int(session_id)
+        return {"configurable": {
+            "thread_id": int(thread_id)
+        }}
+
+    def _final_response(self, final_state: Dict[str, Any]) -> str:
+        # Extract response and intent for memory
+        response_text = final_state.get("messages", [])[-1].content if final_state.get("messages") else "I'm not sure how to respond to that."
+        
+        if final_state.get("error"):
+            return f"Error: {final_state['error']}"
+        
+        return response_text
 
+    async def process_user_input(self, user_input: str, session_id: str) -> str:
+        """Process user input through the conversational workflow"""
         initial_state = {
             "messages": [HumanMessage(content=user_input)]
         }
-        config = {"configurable": {
-            "thread_id": int(thread_id)
-        }}
+        config = self._thread_config(session_id)
         
         final_state = await self.graph.ainvoke(
             initial_state,
             config=config
         )
         
-        # Extract response and intent for memory
-        response_text = final_state.get("messages", [])[-1].content if final_state.get("messages") else "I'm not sure how to respond to that."
-        
-        if final_state.get("error"):
-            return f"Error: {final_state['error']}"
-        
-        return response_text
+        return self._final_response(final_state)
+
+    async def process_user_input_stream(self, user_input: str, session_id: str) -> AsyncIterator[Dict[str, Any]]:
+        """Process user input, yielding node progress, LLM tokens and finally the full response"""
+        initial_state = {
+            "messages": [HumanMessage(content=user_input)]
+        }
+        config = self._thread_config(session_id)
+
+        async for mode, chunk in self.graph.astream(
+            initial_state,
+            config=config,
+            stream_mode=["updates", "messages", "custom"]
+        ):
+            if mode == "updates":
+                for node_name, update in chunk.items():
+                    event = {"type": "node", "node": node_name}
+                    if node_name == "intent_classifier" and update:
+                        event["intent"] = update.get("intent")
+                    yield event
+            elif mode == "messages":
+                message_chunk, metadata = chunk
+                # Only forward tokens of user-facing answers, not classifier or summarizer output
+                if (
+                    isinstance(message_chunk, AIMessageChunk)
+                    and message_chunk.content
+                    and metadata.get("langgraph_node") in TOKEN_STREAMING_NODES
+                ):
+                    yield {"type": "token", "node": metadata["langgraph_node"], "content": message_chunk.content}
+            elif mode == "custom":
+                yield {"type": "progress", **chunk}
+
+        final_state = await self.graph.aget_state(config)
+        yield {"type": "final", "response": self._final_response(final_state.values)}
 
 def session_id_to_int(session_id: str) -> int:
     """Convert session ID string to integer for thread_id"""
@@ -345,8 +582,9 @@ def session_id_to_int(session_id: str) -> int:
         # If it's already a number, return it as int
         return int(session_id)
     except ValueError:
-        # If it's a UUID or other string, convert to hash
-        return abs(hash(session_id)) % (10**8)
+        # If it's a UUID or other string, use a hash that is stable across processes and restarts
+        digest = hashlib.sha256(session_id.encode("utf-8")).digest()
+        return int.from_bytes(digest[:8], "big") >> 1
     
 import asyncio
 
@@ -6,6 +6,122 @@ class Settings(BaseSettings):
     MODEL_NAME: str
     TEMPERATURE: float
 
+    # API workers and conversation persistence ("sqlite" or "memory")
+    API_WORKERS: int = 1
+    CHECKPOINTER: str = "sqlite"
+    CHECKPOINT_DB_PATH: str = "cache/checkpoints.sqlite3"
+    SESSION_DB_PATH: str = "cache/sessions.sqlite3"
+
+    # Classify intent and extract parameters with a single LLM call
+    SINGLE_CALL_ROUTING: bool = False
+
+    # Conversation history sent to the LLM
+    HISTORY_MAX_RECENT_MESSAGES: int = 10
+    HISTORY_TOKEN_BUDGET: int = 1500
+
+    # Summarization pipeline
+    SUMMARY_PIPELINED: bool = True
+    SUMMARY_EXTRACT_CONCURRENCY: int = 4
+    SUMMARY_LLM_CONCURRENCY: int = 4
+    SUMMARY_DB_CONCURRENCY: int = 2
+    # Summarize PDFs while the rest of the day is still downloading
+    SUMMARY_STREAMING: bool = True
+    SUMMARY_STREAM_WORKERS: int = 4
+    SUMMARY_QUEUE_SIZE: int = 8
+    # Papers per batched metadata request (1 disables batching)
+    METADATA_BATCH_SIZE: int = 4
+    METADATA_BATCH_WAIT_SECONDS: float = 0.5
+    # Finished papers written to the database together (1 writes each paper on its own)
+    DB_WRITE_BATCH_SIZE: int = 16
+    DB_WRITE_BATCH_WAIT_SECONDS: float = 0.2
+
+    # PDF extraction (0 workers means one per CPU core)
+    PDF_EXTRACT_WORKERS: int = 0
+    PDF_EXTRACT_MAX_PAGES: int = 0
+    # Safety cap; section selection below decides what reaches the prompts
+    PDF_EXTRACT_MAX_CHARS: int = 80000
+    PDF_EXTRACT_STOP_AT_REFERENCES: bool = True
+
+    # Token budgets for the paper content sent with each prompt
+    METADATA_TOKEN_BUDGET: int = 750
+    DETAILED_SUMMARY_TOKEN_BUDGET: int = 1500
+    LINKEDIN_TOKEN_BUDGET: int = 400
+
+    # Background jobs
+    JOB_WORKERS: int = 2
+    JOB_DB_PATH: str = "cache/jobs.sqlite3"
+    # Jobs without a heartbeat for this long are assumed to belong to a dead worker
+    JOB_STALE_SECONDS: float = 900
+    # How often workers report their running jobs alive and notice cancellations from other workers
+    JOB_HEARTBEAT_SECONDS: float = 15
+    # Progress is written to the job store at most this often
+    JOB_PROGRESS_INTERVAL_SECONDS: float = 1.0
+    # Delay before retrying a job whose date is busy with another job
+    JOB_RETRY_SECONDS: float = 10
+    # Run chat summarize requests as background jobs instead of within the request
+    SUMMARIZE_IN_BACKGROUND: bool = False
+
+    # Off-hours prefetching of recent daily papers (empty windows disable it)
+    PREFETCH_WINDOWS: str = "01:00-06:00"
+    # Dates prefetched, counting back from yesterday; today's page is rarely filled during the window
+    PREFETCH_DAYS_BACK: int = 1
+    PREFETCH_INCLUDE_TODAY: bool = False
+    # A failed prefetch is retried after this delay, doubling each time, at most this many times a day
+    PREFETCH_RETRY_BASE_SECONDS: float = 900
+    PREFETCH_MAX_ATTEMPTS_PER_DAY: int = 3
+    PREFETCH_MAX_CONCURRENT_JOBS: int = 1
+    PREFETCH_CHECK_INTERVAL_SECONDS: float = 300
+    # Only the API worker holding this lock file runs the prefetch scheduler
+    PREFETCH_LOCK_PATH: str = "cache/prefetch.lock"
+
+    # Paper downloads
+    DOWNLOAD_MAX_CONNECTIONS: int = 32
+    DOWNLOAD_LIMIT_PER_HOST: int = 8
+    DOWNLOAD_MAX_RETRIES: int = 4
+    DOWNLOAD_BACKOFF_SECONDS: float = 0.5
+    DOWNLOAD_TIMEOUT_SECONDS: float = 120
+    DOWNLOAD_CONNECT_TIMEOUT_SECONDS: float = 10
+    DOWNLOAD_CHUNK_SIZE: int = 64 * 1024
+
+    # LLM servers (comma-separated Ollama base URLs) and load balancing
+    LLM_ENDPOINTS: str = "http://localhost:11434"
+    LLM_ENDPOINT_MAX_CONCURRENCY: int = 4
+    LLM_EJECT_AFTER_FAILURES: int = 3
+    LLM_HEALTH_CHECK_INTERVAL_SECONDS: float = 30
+    LLM_REQUEST_TIMEOUT_SECONDS: float = 300
+    # Batch calls waiting longer than this are admitted ahead of interactive ones
+    LLM_BATCH_MAX_WAIT_SECONDS: float = 30
+
+    # LLM response cache (empty SQLite path keeps it in memory only, 0 TTL never expires)
+    LLM_CACHE_ENABLED: bool = True
+    LLM_CACHE_NONDETERMINISTIC: bool = False
+    LLM_CACHE_MAX_ENTRIES: int = 1024
+    LLM_CACHE_TTL_SECONDS: float = 7 * 24 * 3600
+    LLM_CACHE_SQLITE_PATH: str = "cache/llm_cache.sqlite3"
+    LLM_CACHE_SQLITE_MAX_ENTRIES: int = 50000
+
+    # Abstract embeddings ("ollama" on the LLM_ENDPOINTS servers, or the offline "hashing" backend)
+    EMBEDDINGS_ENABLED: bool = True
+    EMBEDDING_BACKEND: str = "ollama"
+    EMBEDDING_MODEL: str = "nomic-embed-text"
+    EMBEDDING_STORE_PATH: str = "cache/embeddings.npz"
+    EMBEDDING_BATCH_SIZE: int = 32
+    # Cosine similarity above which a new paper reuses the existing summary (above 1 disables it)
+    DUPLICATE_SIMILARITY_THRESHOLD: float = 0.95
+    SIMILAR_PAPERS_K: int = 5
+
+    # Full-text paper search
+    SEARCH_PAGE_SIZE: int = 10
+
+    # In-process cache of paper lookups (0 TTL never expires)
+    PAPER_CACHE_MAX_ENTRIES: int = 512
+    PAPER_CACHE_TTL_SECONDS: float = 300
+
+    # Extracted text cache
+    TEXT_CACHE_ENABLED: bool = True
+    TEXT_CACHE_DIR: str = "cache/text"
+    TEXT_CACHE_MAX_MB: int = 256
+
     class Config:
         env_file = ".env"
 
@@ -3,13 +3,47 @@ from typing import Annotated,Sequence, Literal, TypedDict
 from langchain_core.messages import BaseMessage
 from langgraph.graph.message import add_messages
 from typing import Dict, List, Any, Optional, Annotated
+from pydantic import BaseModel, field_validator
+
+VALID_INTENTS = [
+    "summarize_papers",
+    "create_linkedin_from_position",
+    "list_papers_by_date",
+    "general_chat",
+    "need_clarification",
+    "modify_linkedin_post",
+    "search_papers",
+    "find_similar_papers",
+]
 
 class AgentState(TypedDict):
     messages: Annotated[Sequence[BaseMessage], add_messages]
     last_response: Optional[str]
     intent: Optional[str]
     current_papers: Optional[List[int]]
+    current_search: Optional[Dict[str, Any]]
     current_post: Optional[int]
     current_post_text: Optional[str]
     parameters: Optional[Dict[str, Any]]
-    error: Optional[str]
\ No newline at end of file
+    error: Optional[str]
+    history_context: Optional[str]
+    history_summary: Optional[str]
+    history_summarized_count: Optional[int]
+
+class IntentResult(BaseModel):
+    """Intent and parameters returned by the single-call router"""
+    intent: str
+    parameters: Dict[str, Any] = {}
+
+    @field_validator("intent")
+    @classmethod
+    def validate_intent(cls, intent: str) -> str:
+        intent = intent.strip().lower()
+        if intent not in VALID_INTENTS:
+            raise ValueError(f"Unknown intent: {intent}")
+        return intent
+
+    @field_validator("parameters", mode="before")
+    @classmethod
+    def default_parameters(cls, parameters: Any) -> Any:
+        return parameters or {}
\ No newline at end of file
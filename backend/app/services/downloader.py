@@ -1,45 +1,176 @@
 # services/pdf_service.py
-import PyPDF2
 from pathlib import Path
-from typing import Optional
+from collections import defaultdict
+from typing import Dict, Optional
 import os
+import contextlib
+import tempfile
+import random
 import asyncio
 import aiohttp
+import aiofiles
 from bs4 import BeautifulSoup
 from datetime import date, datetime
 from app.config.logging import logger
+from app.config.config import settings
+from app.utils.progress import ProgressCallback, ProgressReporter
+from app.utils.singleflight import SingleFlight
 
 class DownloaderService:
     """Service for PDF downloading"""
     def __init__(self, base_papers_dir: Path = Path("papers")):
         self.base_papers_dir = base_papers_dir
+        self._in_flight = SingleFlight("downloads")
+        # A plain download and a streaming download of the same date write the same files
+        self._date_locks: Dict[str, asyncio.Lock] = defaultdict(asyncio.Lock)
     
-    async def download_papers(self, target_date: Optional[str] = None) -> str:
-        """Download papers for specified date"""
-        await self._download_hf_daily_papers(target_date)
-        return f"Papers downloaded for {target_date or 'today'}"
+    async def download_papers(self, target_date: Optional[str] = None, progress_callback: Optional[ProgressCallback] = None) -> str:
+        """Download papers for specified date; concurrent requests for the same date share one download"""
+        target_date = target_date or date.today().isoformat()
+        return await self._in_flight.do(("download", target_date), self._download_papers, target_date, progress_callback)
+
+    async def _download_papers(self, target_date: str, progress_callback: Optional[ProgressCallback] = None) -> str:
+        async with self._date_locks[target_date]:
+            stats = await self._download_hf_daily_papers(target_date, progress_callback=progress_callback)
+        return self._describe_download(target_date, stats)
+
+    async def stream_papers(self, target_date: Optional[str], pdf_queue: asyncio.Queue, progress_callback: Optional[ProgressCallback] = None) -> str:
+        """Download papers, putting each PDF path on the queue as soon as it is on disk.
+
+        A None sentinel is always put on the queue when the producer is done.
+        """
+        target_date = target_date or date.today().isoformat()
+        try:
+            async with self._date_locks[target_date]:
+                stats = await self._download_hf_daily_papers(target_date, pdf_queue, progress_callback)
+        finally:
+            await pdf_queue.put(None)
+        return self._describe_download(target_date, stats)
+
+    @staticmethod
+    def _describe_download(target_date: Optional[str], stats: Dict[str, int]) -> str:
+        return (
+            f"Papers downloaded for {target_date or 'today'} "
+            f"({stats['downloaded']} new, {stats['skipped']} already present, {stats['failed']} failed)"
+        )
+
+    def _create_session(self) -> aiohttp.ClientSession:
+        """Create one HTTP session whose connector caps connections per host"""
+        connector = aiohttp.TCPConnector(
+            limit=settings.DOWNLOAD_MAX_CONNECTIONS,
+            limit_per_host=settings.DOWNLOAD_LIMIT_PER_HOST
+        )
+        timeout = aiohttp.ClientTimeout(
+            total=settings.DOWNLOAD_TIMEOUT_SECONDS,
+            sock_connect=settings.DOWNLOAD_CONNECT_TIMEOUT_SECONDS
+        )
+        return aiohttp.ClientSession(connector=connector, timeout=timeout)
+
+    async def _with_retries(self, url: str, operation):
+        """Run an HTTP operation, retrying transient failures with exponential backoff"""
+        for attempt in range(1, settings.DOWNLOAD_MAX_RETRIES + 1):
+            try:
+                return await operation()
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                # Client errors other than rate limiting will not succeed on retry
+                if isinstance(e, aiohttp.ClientResponseError) and 400 <= e.status < 500 and e.status != 429:
+                    raise
+                if attempt == settings.DOWNLOAD_MAX_RETRIES:
+                    raise
+                delay = settings.DOWNLOAD_BACKOFF_SECONDS * (2 ** (attempt - 1))
+                delay += random.uniform(0, delay / 2)
+                logger.warning(f"🔁 Retrying {url} in {delay:.1f}s (attempt {attempt} failed: {e!r})")
+                await asyncio.sleep(delay)
     
     async def _fetch(self, session, url):
-        async with session.get(url) as resp:
-            resp.raise_for_status()
-            return await resp.text()
+        async def operation():
+            async with session.get(url) as resp:
+                resp.raise_for_status()
+                return await resp.text()
 
-    async def _fetch_pdf(self, session, url, path):
-        async with session.get(url) as resp:
-            resp.raise_for_status()
-            content = await resp.read()
-            with open(path, "wb") as f:
-                f.write(content)
+        return await self._with_retries(url, operation)
 
-    # TODO: Add error handling, add path datafolder in input
+    async def _fetch_pdf(self, session, url, path):
+        """Stream a PDF to a temporary file and move it into place once complete"""
+        # Unique per download, so other worker processes fetching the same paper never share it
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix=f"{os.path.basename(path)}.", suffix=".part")
+        os.close(fd)
+
+        async def operation():
+            async with session.get(url) as resp:
+                resp.raise_for_status()
+                async with aiofiles.open(tmp_path, "wb") as f:
+                    async for chunk in resp.content.iter_chunked(settings.DOWNLOAD_CHUNK_SIZE):
+                        await f.write(chunk)
+            os.replace(tmp_path, path)
 
-    async def _download_hf_daily_papers(self, target_date=None):
+        try:
+            await self._with_retries(url, operation)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    async def _resolve_pdf_url(self, session, base_url: str, link: str) -> Optional[str]:
+        """Find the PDF link on a paper page"""
+        paper_url = base_url + link
+        logger.info(f"➡️ Visiting paper page: {paper_url}")
+
+        paper_html = await self._fetch(session, paper_url)
+        paper_soup = BeautifulSoup(paper_html, "html.parser")
+
+        pdf_button = paper_soup.select_one("a.btn[href*='/pdf/']")
+        if not pdf_button:
+            logger.info(f"❌ No PDF found for {paper_url}")
+            return None
+
+        pdf_url = pdf_button["href"]
+        if pdf_url.startswith("/"):
+            pdf_url = base_url + pdf_url
+        return pdf_url
+
+    async def _download_paper(self, session, base_url: str, link: str, output_dir: str, pdf_queue: Optional[asyncio.Queue] = None) -> str:
+        """Download a single paper and return what happened to it"""
+        pdf_url = await self._resolve_pdf_url(session, base_url, link)
+        if not pdf_url:
+            return "missing"
+
+        pdf_name = pdf_url.split("/")[-1]
+        if not pdf_name.endswith(".pdf"):
+            pdf_name += ".pdf"
+        pdf_path = os.path.join(output_dir, pdf_name)
+
+        # Downloads only appear under their final name once fully written
+        if os.path.exists(pdf_path):
+            logger.info(f"⏭️ Skipping (already downloaded): {pdf_name}")
+            status = "skipped"
+        else:
+            logger.info(f"⬇️ Downloading: {pdf_url} -> {pdf_path}")
+            await self._fetch_pdf(session, pdf_url, pdf_path)
+            status = "downloaded"
+
+        if pdf_queue is not None:
+            # Blocks while the consumer is behind; the caller's download slot stays taken meanwhile
+            await pdf_queue.put(Path(pdf_path))
+        return status
+
+    async def _download_hf_daily_papers(
+        self,
+        target_date=None,
+        pdf_queue: Optional[asyncio.Queue] = None,
+        progress_callback: Optional[ProgressCallback] = None
+    ) -> Dict[str, int]:
         """
         Download all PDFs from HuggingFace's daily papers page for a given date (async).
         
         Args:
             target_date (str or None): date in YYYY-MM-DD format.
                                     If None, today's date is used.
+            pdf_queue (asyncio.Queue or None): receives the path of every
+                                    PDF available on disk as it becomes ready.
+            progress_callback (callable or None): receives an event per finished paper.
+
+        Returns:
+            Counts of downloaded, skipped, missing and failed papers.
         """
         if target_date is None:
             target_date = date.today().isoformat()
@@ -58,7 +189,7 @@ class DownloaderService:
         base_url = "https://huggingface.co"
         daily_url = f"{base_url}/papers/date/{target_date}"
 
-        async with aiohttp.ClientSession() as session:
+        async with self._create_session() as session:
             logger.info(f"📄 Fetching daily papers from {daily_url} ...")
             daily_html = await self._fetch(session, daily_url)
             soup = BeautifulSoup(daily_html, "html.parser")
@@ -74,38 +205,39 @@ class DownloaderService:
                     paper_links.append(href)
 
             logger.info(f"🔎 Found {len(paper_links)} papers.")
-
-            pdf_tasks = []
-
-            for link in paper_links:
-                paper_url = base_url + link
-                logger.info(f"➡️ Visiting paper page: {paper_url}")
-
-                paper_html = await self._fetch(session, paper_url)
-                paper_soup = BeautifulSoup(paper_html, "html.parser")
-
-                pdf_button = paper_soup.select_one("a.btn[href*='/pdf/']")
-                if not pdf_button:
-                    logger.info(f"❌ No PDF found for {paper_url}")
-                    continue
-
-                pdf_url = pdf_button["href"]
-                if pdf_url.startswith("/"):
-                    pdf_url = base_url + pdf_url
-
-                pdf_name = pdf_url.split("/")[-1]
-                if not pdf_name.endswith(".pdf"):
-                    pdf_name += ".pdf"
-                pdf_path = os.path.join(output_dir, pdf_name)
-
-                if os.path.exists(pdf_path):
-                    logger.info(f"⏭️ Skipping (already downloaded): {pdf_name}")
-                    continue
-
-                logger.info(f"⬇️ Queuing download: {pdf_url} -> {pdf_path}")
-                pdf_tasks.append(self._fetch_pdf(session, pdf_url, pdf_path))
-
-            # Wait for all downloads concurrently
-            await asyncio.gather(*pdf_tasks)
-
-        logger.info(f"✅ All available PDFs saved in {output_dir}")
\ No newline at end of file
+            progress = ProgressReporter(progress_callback, "paper_downloaded", total=len(paper_links))
+            progress.emit("papers_found", total=len(paper_links))
+
+            # With a bounded queue, at most its size of papers are downloading or waiting
+            # to be queued, so a slow consumer holds back further downloads
+            slots = (
+                asyncio.Semaphore(pdf_queue.maxsize)
+                if pdf_queue is not None and pdf_queue.maxsize > 0 else contextlib.nullcontext()
+            )
+
+            async def download(link: str) -> str:
+                try:
+                    async with slots:
+                        status = await self._download_paper(session, base_url, link, output_dir, pdf_queue)
+                except Exception:
+                    progress.advance(link, ok=False)
+                    raise
+                progress.advance(link)
+                return status
+
+            # Page fetches and downloads run concurrently; the connector bounds them
+            results = await asyncio.gather(
+                *(download(link) for link in paper_links),
+                return_exceptions=True
+            )
+
+        stats = {"downloaded": 0, "skipped": 0, "missing": 0, "failed": 0}
+        for link, result in zip(paper_links, results):
+            if isinstance(result, BaseException):
+                logger.error(f"❌ Failed to download {link}: {result!r}")
+                stats["failed"] += 1
+            else:
+                stats[result] += 1
+
+        logger.info(f"✅ All available PDFs saved in {output_dir} ({stats})")
+        return stats
@@ -0,0 +1,360 @@
+import os
+import re
+import fcntl
+import asyncio
+import hashlib
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Protocol, Sequence, Tuple
+
+import numpy as np
+
+from app.config.config import settings
+from app.config.logging import logger
+from app.services.database import DatabaseService
+from app.services.llm import LLMService
+from app.services.llm_scheduler import Priority
+from app.utils.sections import split_sections, truncate_to_tokens
+from app.utils.utils import extract_paper_text
+from app.utils.process_lock import ProcessLock
+
+# Papers are embedded from the start of their abstract, so vectors stay comparable
+EMBEDDING_MAX_TOKENS = 512
+# How often a worker waiting for another worker's backfill checks whether it is done
+BACKFILL_LOCK_POLL_SECONDS = 5
+
+_WORD = re.compile(r"[a-z0-9]+")
+
+
+class Embedder(Protocol):
+    """Turns texts into fixed-size vectors"""
+
+    name: str
+
+    async def embed(self, texts: Sequence[str]) -> np.ndarray:
+        """Return one row per text"""
+        ...
+
+
+class OllamaEmbedder:
+    """Embeddings from an Ollama embedding model on the chat model's servers.
+
+    Requests go through the LLM service's admission queue, as batch work, and
+    its endpoint pool, so embedding shares their capacity and failover.
+    """
+
+    def __init__(self, model: str, llm_service: LLMService):
+        from langchain_ollama import OllamaEmbeddings
+
+        self.name = f"ollama:{model}"
+        self.llm_service = llm_service
+        self._clients = {
+            endpoint.base_url: OllamaEmbeddings(model=model, base_url=endpoint.base_url)
+            for endpoint in llm_service.llm.endpoints
+        }
+
+    async def embed(self, texts: Sequence[str]) -> np.ndarray:
+        texts = list(texts)
+        vectors = await self.llm_service.run_on_endpoint(
+            lambda endpoint: self._clients[endpoint.base_url].aembed_documents(texts), priority=Priority.BATCH
+        )
+        return np.asarray(vectors, dtype=np.float32)
+
+
+class HashingEmbedder:
+    """Deterministic bag-of-words embeddings from hashed unigrams and bigrams.
+
+    Needs no model, so it works offline and gives stable vectors for tests.
+    """
+
+    def __init__(self, dim: int = 512):
+        self.dim = dim
+        self.name = f"hashing:{dim}"
+
+    def _embed_one(self, text: str) -> np.ndarray:
+        vector = np.zeros(self.dim, dtype=np.float32)
+        words = _WORD.findall(text.lower())
+        for feature in words + [f"{a} {b}" for a, b in zip(words, words[1:])]:
+            digest = hashlib.blake2b(feature.encode("utf-8"), digest_size=8).digest()
+            index = int.from_bytes(digest[:4], "little") % self.dim
+            vector[index] += 1.0 if digest[4] & 1 else -1.0
+        return vector
+
+    async def embed(self, texts: Sequence[str]) -> np.ndarray:
+        if not texts:
+            return np.zeros((0, self.dim), dtype=np.float32)
+        return np.stack([self._embed_one(text) for text in texts])
+
+
+def _normalize(vectors: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors / np.where(norms == 0, 1.0, norms)
+
+
+def embedding_text(text_content: str) -> str:
+    """The part of a paper's extracted text that it is embedded from.
+
+    Every vector comes from here (new papers, backfill and lookups alike),
+    using the abstract section, or the text before the first heading.
+    """
+    sections = split_sections(text_content)
+    source = sections.get("abstract") or sections.get("preamble") or text_content
+    return truncate_to_tokens(source, EMBEDDING_MAX_TOKENS)
+
+
+class EmbeddingStore:
+    """Paper vectors in one normalized matrix, searched with batched cosine similarity"""
+
+    def __init__(self, path: Optional[Path] = None, embedder_name: str = ""):
+        self.path = Path(path) if path else None
+        self.embedder_name = embedder_name
+        self.ids: List[int] = []
+        self.matrix = np.zeros((0, 0), dtype=np.float32)
+        self._positions: Dict[int, int] = {}
+        self._dirty = False
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def __contains__(self, paper_id: int) -> bool:
+        return paper_id in self._positions
+
+    def add(self, paper_ids: Sequence[int], vectors: np.ndarray):
+        """Insert or replace the vectors of the given papers"""
+        self._add(paper_ids, vectors)
+        self._dirty = True
+
+    def merge(self, paper_ids: Sequence[int], vectors: np.ndarray):
+        """Add vectors written by another process for papers this store does not have"""
+        missing = [index for index, paper_id in enumerate(paper_ids) if paper_id not in self._positions]
+        if missing:
+            self._add([paper_ids[index] for index in missing], np.asarray(vectors)[missing])
+
+    def _add(self, paper_ids: Sequence[int], vectors: np.ndarray):
+        vectors = _normalize(np.asarray(vectors, dtype=np.float32).reshape(len(paper_ids), -1))
+        if not len(self.ids):
+            self.matrix = np.zeros((0, vectors.shape[1]), dtype=np.float32)
+        elif vectors.shape[1] != self.matrix.shape[1]:
+            raise ValueError(f"Vector size {vectors.shape[1]} does not match the store ({self.matrix.shape[1]})")
+
+        rows = len(self.ids)
+        new_rows = []
+        for paper_id, vector in zip(paper_ids, vectors):
+            position = self._positions.get(paper_id)
+            if position is None:
+                self._positions[paper_id] = len(self.ids)
+                new_rows.append(vector)
+                self.ids.append(paper_id)
+            elif position >= rows:
+                new_rows[position - rows] = vector
+            else:
+                self.matrix[position] = vector
+        if new_rows:
+            self.matrix = np.vstack([self.matrix, np.stack(new_rows)])
+
+    def vector(self, paper_id: int) -> Optional[np.ndarray]:
+        position = self._positions.get(paper_id)
+        return None if position is None else self.matrix[position]
+
+    def top_k(
+        self,
+        queries: np.ndarray,
+        k: int,
+        exclude: Optional[Iterable[Optional[int]]] = None
+    ) -> List[List[Tuple[int, float]]]:
+        """Return the k most similar papers for each query row, best first.
+
+        exclude gives, per query, a paper id to leave out (usually the query paper itself).
+        """
+        if not self.ids or k <= 0:
+            return [[] for _ in range(len(queries))]
+        scores = _normalize(np.asarray(queries, dtype=np.float32)) @ self.matrix.T
+        for row, paper_id in enumerate(exclude or []):
+            if paper_id in self._positions:
+                scores[row, self._positions[paper_id]] = -np.inf
+
+        k = min(k, len(self.ids))
+        top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+        results = []
+        for row, candidates in enumerate(top):
+            ordered = candidates[np.argsort(-scores[row, candidates])]
+            results.append([
+                (self.ids[column], float(scores[row, column]))
+                for column in ordered if np.isfinite(scores[row, column])
+            ])
+        return results
+
+    def read(self) -> Optional[Tuple[np.ndarray, np.ndarray]]:
+        """The ids and matrix on disk, or None when missing or written for another embedder"""
+        if not self.path or not self.path.exists():
+            return None
+        with np.load(self.path, allow_pickle=False) as data:
+            if str(data["embedder"]) != self.embedder_name:
+                logger.info(f"Ignoring embeddings from {data['embedder']} (now using {self.embedder_name})")
+                return None
+            return data["ids"].astype(np.int64), data["matrix"].astype(np.float32)
+
+    def load(self) -> bool:
+        """Load the store from disk, ignoring files written for another embedder"""
+        stored = self.read()
+        if stored is None:
+            return False
+        ids, self.matrix = stored
+        self.ids = [int(paper_id) for paper_id in ids]
+        self._positions = {paper_id: position for position, paper_id in enumerate(self.ids)}
+        self._dirty = False
+        return True
+
+    def snapshot(self) -> Optional[Tuple[np.ndarray, np.ndarray]]:
+        """Copy the changed contents for writing, or None when there is nothing to save"""
+        if not self.path or not self._dirty:
+            return None
+        self._dirty = False
+        return np.asarray(self.ids, dtype=np.int64), self.matrix.copy()
+
+    def write(self, ids: np.ndarray, matrix: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Merge a snapshot into the file on disk and replace it atomically.
+
+        Every API worker process writes the same file, so rows on disk for
+        papers missing from the snapshot are kept; the snapshot wins for papers
+        in both. Returns the rows that only the file had. Safe to run in a
+        thread while the store keeps changing.
+        """
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.path.with_suffix(".lock"), "w") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            stored = self.read()
+            other_ids = np.zeros(0, dtype=np.int64)
+            others = np.zeros((0, matrix.shape[1]), dtype=np.float32)
+            if stored is not None and stored[1].shape[1:] == matrix.shape[1:]:
+                keep = ~np.isin(stored[0], ids)
+                other_ids, others = stored[0][keep], stored[1][keep]
+
+            tmp_path = self.path.with_name(f"{self.path.stem}.{os.getpid()}.tmp.npz")
+            np.savez(
+                tmp_path,
+                ids=np.concatenate([ids, other_ids]),
+                matrix=np.vstack([matrix, others]),
+                embedder=self.embedder_name
+            )
+            os.replace(tmp_path, self.path)
+        return other_ids, others
+
+    def save(self):
+        snapshot = self.snapshot()
+        if snapshot is not None:
+            other_ids, others = self.write(*snapshot)
+            self.merge([int(paper_id) for paper_id in other_ids], others)
+
+
+def build_embedder(llm_service: LLMService) -> Embedder:
+    if settings.EMBEDDING_BACKEND == "hashing":
+        return HashingEmbedder()
+    return OllamaEmbedder(settings.EMBEDDING_MODEL, llm_service)
+
+
+class EmbeddingService:
+    """Abstract embeddings of stored papers, for near-duplicate detection and similar-paper lookup"""
+
+    def __init__(self, database_service: DatabaseService, embedder: Embedder, store: Optional[EmbeddingStore] = None):
+        self.database_service = database_service
+        self.embedder = embedder
+        self.store = store or EmbeddingStore(Path(settings.EMBEDDING_STORE_PATH), self.embedder.name)
+        self._lock = asyncio.Lock()
+        self._backfill_task: Optional[asyncio.Task] = None
+
+    async def start(self):
+        """Load the persisted vectors and embed papers stored since then in the background"""
+        loaded = await asyncio.to_thread(self.store.load)
+        logger.info(f"🧭 Embedding store: {len(self.store)} papers {'loaded' if loaded else 'starting empty'}")
+        # Serving does not wait for it; papers not embedded yet are only missed as duplicates
+        self._backfill_task = asyncio.create_task(self._run_backfill())
+
+    async def stop(self):
+        if self._backfill_task:
+            self._backfill_task.cancel()
+            await asyncio.gather(self._backfill_task, return_exceptions=True)
+            self._backfill_task = None
+        await self.flush()
+
+    async def flush(self):
+        async with self._lock:
+            snapshot = self.store.snapshot()
+            if snapshot is not None:
+                other_ids, others = await asyncio.to_thread(self.store.write, *snapshot)
+                self.store.merge([int(paper_id) for paper_id in other_ids], others)
+
+    async def _run_backfill(self):
+        """Backfill in one API worker process at a time.
+
+        Workers that start together wait for the first one's backfill, then
+        pick up what it wrote, so the archive is extracted and embedded once.
+        """
+        lock = ProcessLock(self.store.path.with_suffix(".backfill.lock")) if self.store.path else None
+        try:
+            while lock and not lock.acquire():
+                await asyncio.sleep(BACKFILL_LOCK_POLL_SECONDS)
+            stored = await asyncio.to_thread(self.store.read) if lock else None
+            if stored is not None:
+                before = len(self.store)
+                self.store.merge([int(paper_id) for paper_id in stored[0]], stored[1])
+                if len(self.store) > before:
+                    logger.info(f"🧭 Picked up {len(self.store) - before} embeddings written by other workers")
+            await self.backfill()
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"Embedding backfill failed: {e!r}")
+        finally:
+            if lock:
+                lock.release()
+
+    async def backfill(self):
+        """Embed stored papers missing from the index from their PDFs, in batches"""
+        missing = [
+            (paper_id, Path(paper_path))
+            for paper_id, paper_path in await self.database_service.get_paper_paths()
+            if paper_id not in self.store
+        ]
+        embedded = 0
+        batch_size = settings.EMBEDDING_BATCH_SIZE
+        for start in range(0, len(missing), batch_size):
+            batch = [(paper_id, path) for paper_id, path in missing[start:start + batch_size] if path.exists()]
+            if not batch:
+                continue
+            texts = await asyncio.gather(*(extract_paper_text(path) for _, path in batch))
+            batch = [(paper_id, text) for (paper_id, _), text in zip(batch, texts) if text]
+            if not batch:
+                continue
+            vectors = await self.embedder.embed([embedding_text(text) for _, text in batch])
+            self.store.add([paper_id for paper_id, _ in batch], vectors)
+            embedded += len(batch)
+        if missing:
+            logger.info(f"🧭 Embedded {embedded} of {len(missing)} stored papers missing from the index")
+            await self.flush()
+
+    async def embed_paper(self, text_content: str) -> np.ndarray:
+        """Embed a paper from its extracted text"""
+        return (await self.embedder.embed([embedding_text(text_content)]))[0]
+
+    def add(self, paper_id: int, vector: np.ndarray):
+        self.store.add([paper_id], vector[None, :])
+
+    def nearest(self, vector: np.ndarray) -> Optional[Tuple[int, float]]:
+        """The closest stored paper and its cosine similarity"""
+        matches = self.store.top_k(vector[None, :], 1)[0]
+        return matches[0] if matches else None
+
+    async def similar_papers(self, paper_id: int, k: int) -> List[Tuple[int, float]]:
+        """Papers most similar to a stored paper, best first"""
+        vector = self.store.vector(paper_id)
+        if vector is None:
+            paper = await self.database_service.get_paper_by_id(paper_id)
+            if not paper:
+                raise ValueError(f"No paper found id: {paper_id}")
+            pdf_path = Path(paper.paper_path)
+            text_content = await extract_paper_text(pdf_path) if pdf_path.exists() else ""
+            if not text_content:
+                raise ValueError(f"The PDF of '{paper.title}' is not available to compare it with other papers")
+            vector = await self.embed_paper(text_content)
+            self.add(paper_id, vector)
+        return self.store.top_k(vector[None, :], k, exclude=[paper_id])[0]
@@ -0,0 +1,179 @@
+import re
+from datetime import date, timedelta
+from typing import Any, Dict, Optional, Tuple
+
+MONTHS = {
+    "jan": 1, "january": 1, "feb": 2, "february": 2, "mar": 3, "march": 3,
+    "apr": 4, "april": 4, "may": 5, "jun": 6, "june": 6, "jul": 7, "july": 7,
+    "aug": 8, "august": 8, "sep": 9, "sept": 9, "september": 9, "oct": 10, "october": 10,
+    "nov": 11, "november": 11, "dec": 12, "december": 12,
+}
+
+ORDINALS = {
+    "first": 1, "second": 2, "third": 3, "fourth": 4, "fifth": 5,
+    "sixth": 6, "seventh": 7, "eighth": 8, "ninth": 9, "tenth": 10,
+}
+
+_MONTH_NAMES = "|".join(sorted(MONTHS, key=len, reverse=True))
+
+ISO_DATE = re.compile(r"\b(\d{4})-(\d{1,2})-(\d{1,2})\b")
+MONTH_DAY = re.compile(rf"\b({_MONTH_NAMES})\.?\s+(\d{{1,2}})(?:st|nd|rd|th)?(?:,?\s+(\d{{4}}))?\b")
+DAY_MONTH = re.compile(rf"\b(\d{{1,2}})(?:st|nd|rd|th)?\s+(?:of\s+)?({_MONTH_NAMES})\.?(?:,?\s+(\d{{4}}))?\b")
+RELATIVE_DATE = re.compile(r"\b(day before yesterday|yesterday|today)\b")
+RELATIVE_RANGE = re.compile(r"\b(?:the\s+)?(last|past|this)\s+(week|month|(\d{1,3})\s+days)\b")
+
+LIST_REQUEST = re.compile(
+    r"^(?:please\s+|can you\s+|could you\s+)?(?:list|show)(?:\s+me)?(?:\s+the)?(?:\s+all)?(?:\s+available)?\s+papers?\b"
+    r"|\bwhat papers (?:are|were) (?:there|available|published)\b"
+)
+SUMMARIZE_REQUEST = re.compile(r"\b(?:re-?)?summari[sz]e\b|\bregenerate\b.*\bsummar")
+FORCE_REQUEST = re.compile(r"\b(?:regenerate|redo|re-?summari[sz]e|from scratch|force)\b")
+# A creation verb before "post", so "post-training" or "post hoc" questions are not post requests
+POST_REQUEST = re.compile(
+    r"\b(?:make|create|write|generate|draft)\s+(?:me\s+)?(?:a\s+|an\s+|the\s+)?(?:linkedin\s+)?post\b(?!-)"
+)
+SEARCH_REQUEST = re.compile(
+    r"^(?:please\s+|can you\s+|could you\s+)?(?:search|find|look)(?:\s+for|\s+up)?(?:\s+me)?"
+    r"(?:\s+the|\s+a|\s+any)?\s+papers?\s+(?:about|on|regarding|related to|mentioning|that mention)\s+(.+)$"
+)
+SIMILAR_REQUEST = re.compile(r"\bsimilar\s+(?:papers?\s+)?to\b|\b(?:related|similar)\s+papers?\b|\blike\s+(?:paper\s*)?#")
+NEXT_PAGE = re.compile(r"^(?:show\s+(?:me\s+)?)?(?:the\s+)?(?:next page|more results)(?:\s+please)?$")
+# Prepositions left dangling once a date phrase is cut out of a search query
+TRAILING_PREPOSITION = re.compile(r"\s+(?:from|on|in|of|during|over|published)$")
+POSITION = re.compile(rf"(?:\bpaper\s*(?:number|no\.?|#)?\s*|#|\bnumber\s+)(\d{{1,3}})\b|\b({'|'.join(ORDINALS)})\s+(?:paper|one)\b")
+# Requests that depend on conversational context are left to the LLM
+AMBIGUOUS = re.compile(r"\b(?:change|modify|edit|rewrite|shorter|longer|tone|instead|not|don't|why|how|explain)\b")
+
+MAX_WORDS = 16
+
+
+def parse_date(text: str, today: Optional[date] = None) -> Optional[Tuple[date, str]]:
+    """Find an explicit or relative date in the text, returning it with the matched words"""
+    today = today or date.today()
+
+    match = ISO_DATE.search(text)
+    if match:
+        year, month, day = (int(group) for group in match.groups())
+        return _safe_date(year, month, day, match.group(0))
+
+    match = MONTH_DAY.search(text)
+    if match:
+        month_name, day, year = match.groups()
+        return _safe_date(int(year or today.year), MONTHS[month_name], int(day), match.group(0))
+
+    match = DAY_MONTH.search(text)
+    if match:
+        day, month_name, year = match.groups()
+        return _safe_date(int(year or today.year), MONTHS[month_name], int(day), match.group(0))
+
+    match = RELATIVE_DATE.search(text)
+    if match:
+        offsets = {"today": 0, "yesterday": 1, "day before yesterday": 2}
+        return today - timedelta(days=offsets[match.group(1)]), match.group(0)
+
+    return None
+
+
+def parse_date_range(text: str, today: Optional[date] = None) -> Optional[Tuple[date, date, str]]:
+    """Find a date range such as "last week" or a single date, returning (since, until, matched words)"""
+    today = today or date.today()
+
+    match = RELATIVE_RANGE.search(text)
+    if match:
+        which, unit, days = match.groups()
+        if days:
+            since = today - timedelta(days=int(days))
+        elif unit == "week":
+            since = today - timedelta(days=today.weekday()) if which == "this" else today - timedelta(days=7)
+        else:
+            since = today.replace(day=1) if which == "this" else today - timedelta(days=30)
+        return since, today, match.group(0)
+
+    found = parse_date(text, today)
+    if found:
+        found_date, description = found
+        return found_date, found_date, description
+    return None
+
+
+def _safe_date(year: int, month: int, day: int, description: str) -> Optional[Tuple[date, str]]:
+    try:
+        return date(year, month, day), description
+    except ValueError:
+        return None
+
+
+def _date_parameters(found: Tuple[date, str]) -> Dict[str, Any]:
+    found_date, description = found
+    return {
+        "year": f"{found_date.year:04d}",
+        "month": f"{found_date.month:02d}",
+        "day": f"{found_date.day:02d}",
+        "date_description": description,
+    }
+
+
+def _position(text: str) -> Optional[int]:
+    match = POSITION.search(text)
+    if not match:
+        return None
+    return int(match.group(1)) if match.group(1) else ORDINALS[match.group(2)]
+
+
+def _search_parameters(query: str, today: Optional[date] = None) -> Dict[str, Any]:
+    parameters: Dict[str, Any] = {"page": "1"}
+    found = parse_date_range(query, today)
+    if found:
+        since, until, description = found
+        query = query.replace(description, " ")
+        parameters.update(since=since.isoformat(), until=until.isoformat(), date_description=description)
+    query = TRAILING_PREPOSITION.sub("", " ".join(query.split()).strip(" .?!"))
+    parameters["query"] = query
+    return parameters
+
+
+class FastPathClassifier:
+    """Deterministic rules for commands that do not need the LLM to be understood"""
+
+    def classify(self, user_input: str, today: Optional[date] = None) -> Optional[Tuple[str, Dict[str, Any]]]:
+        """Return (intent, parameters) when the input is unambiguous, otherwise None"""
+        text = " ".join(user_input.lower().split())
+        if not text or len(text.split()) > MAX_WORDS or AMBIGUOUS.search(text):
+            return None
+
+        if NEXT_PAGE.search(text):
+            return "search_papers", {"page": "next"}
+
+        is_summarize = bool(SUMMARIZE_REQUEST.search(text))
+        is_post = bool(POST_REQUEST.search(text))
+        if SIMILAR_REQUEST.search(text) and not (is_summarize or is_post):
+            position = _position(text)
+            return ("find_similar_papers", {"paper_position": str(position)}) if position else None
+
+        is_list = bool(LIST_REQUEST.search(text))
+        search = SEARCH_REQUEST.search(text)
+        if is_list + is_summarize + is_post + bool(search) != 1:
+            return None
+
+        if search:
+            return "search_papers", _search_parameters(search.group(1), today)
+
+        if is_post:
+            position = _position(text)
+            if not position:
+                return None
+            return "create_linkedin_from_position", {"paper_position": str(position)}
+
+        found = parse_date(text, today)
+        if not found:
+            return None
+
+        if is_list:
+            return "list_papers_by_date", _date_parameters(found)
+
+        # "summarize paper 3" refers to a single listed paper, not a date
+        if POSITION.search(text):
+            return None
+        parameters = _date_parameters(found)
+        parameters["force"] = "true" if FORCE_REQUEST.search(text) else "false"
+        return "summarize_papers", parameters
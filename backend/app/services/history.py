@@ -0,0 +1,86 @@
+from typing import List, Optional, Sequence, Tuple
+from langchain_core.messages import AIMessage, BaseMessage, HumanMessage, SystemMessage
+
+from app.config.config import settings
+from app.config.logging import logger
+from app.services.llm import LLMService
+from app.utils.tokens import count_tokens
+from app.utils.utils import get_prompt_template
+
+ROLE_MAP = {
+    SystemMessage: "System",
+    HumanMessage: "Human",
+    AIMessage: "Assistant",
+}
+
+
+def format_message(message: BaseMessage) -> str:
+    return f"{ROLE_MAP.get(type(message), 'Unknown')}: {message.content}"
+
+
+class ConversationHistoryService:
+    """Builds a token-budgeted conversation history with a rolling summary of older turns"""
+
+    def __init__(
+        self,
+        llm_service: LLMService,
+        max_recent_messages: int = settings.HISTORY_MAX_RECENT_MESSAGES,
+        token_budget: int = settings.HISTORY_TOKEN_BUDGET
+    ):
+        self.llm_service = llm_service
+        self.max_recent_messages = max_recent_messages
+        self.token_budget = token_budget
+
+    async def build_history(
+        self,
+        messages: Sequence[BaseMessage],
+        summary: Optional[str] = None,
+        summarized_count: int = 0
+    ) -> Tuple[str, Optional[str], int]:
+        """Return the history text plus the updated running summary and how many messages it covers.
+
+        The newest messages are kept verbatim while they fit in the message and
+        token limits. Older messages not yet covered by the summary are folded
+        into it, so each message is summarized only once.
+        """
+        summary_tokens = count_tokens(summary) if summary else 0
+        recent_start = len(messages)
+        used_tokens = summary_tokens
+        for index in range(len(messages) - 1, -1, -1):
+            message_tokens = count_tokens(format_message(messages[index]))
+            if len(messages) - index > self.max_recent_messages or used_tokens + message_tokens > self.token_budget:
+                break
+            used_tokens += message_tokens
+            recent_start = index
+
+        if recent_start > summarized_count:
+            new_summary = await self._update_summary(summary, messages[summarized_count:recent_start])
+            if new_summary is not None:
+                summary, summarized_count = new_summary, recent_start
+
+        recent_messages = messages[max(recent_start, summarized_count):]
+        history_lines: List[str] = []
+        if summary:
+            history_lines.append(f"Summary of earlier conversation: {summary}")
+        history_lines.extend(format_message(message) for message in recent_messages)
+
+        return "\n".join(history_lines), summary, summarized_count
+
+    async def _update_summary(self, summary: Optional[str], messages: Sequence[BaseMessage]) -> Optional[str]:
+        """Fold messages into the running summary, returning None if the LLM call fails"""
+        logger.info(f"Folding {len(messages)} messages into the conversation summary")
+
+        transcript = "\n".join(format_message(message) for message in messages)
+        prompt = get_prompt_template("summarize_history.txt")
+        human_content = f"""Current Summary:
+{summary or "(empty)"}
+
+New Messages:
+{transcript}"""
+
+        try:
+            response = await self.llm_service.generate_response(prompt.format_messages(input=human_content))
+        except Exception as e:
+            logger.error(f"Error summarizing conversation history: {str(e)}")
+            return None
+        return response.content.strip()
@@ -1,31 +1,70 @@
-from langchain_core.messages import HumanMessage, SystemMessage
-from langchain_core.prompts import ChatPromptTemplate
+import json
+from collections import Counter
+from typing import Any, Dict, Optional, Tuple
+
+from pydantic import ValidationError
 
 from app.config.logging import logger
+from app.models.agent import VALID_INTENTS, IntentResult
 from app.services.llm import LLMService
-from app.utils.utils import retrieve_prompt
+from app.services.fast_path import FastPathClassifier
+from app.utils.utils import get_prompt_template
 
 class IntentClassifierService:
     def __init__(self, llm_service: LLMService):
         self.llm_service = llm_service
+        self.fast_path = FastPathClassifier()
+        # How many messages each tier has answered
+        self.tier_counts = Counter()
+
+    def classify_fast(self, user_input: str) -> Optional[Tuple[str, Dict[str, Any]]]:
+        """Classify trivially recognisable commands without calling the LLM"""
+        result = self.fast_path.classify(user_input)
+        if result:
+            self.tier_counts["rules"] += 1
+            logger.info(f"Fast-path intent: {result[0]} ({dict(self.tier_counts)})")
+        return result
         
     async def classify_intent(self, history: str, user_input: str) -> str:
         """Classify user intent from natural language input"""
         logger.info("Entered IntentClassifierService.classify_intent")
 
-        system_prompt_content = retrieve_prompt("classify_intent.txt")
-
-        prompt = ChatPromptTemplate.from_messages([
-            SystemMessage(content=system_prompt_content),
-            HumanMessage(content=f"""Conversation History:
+        prompt = get_prompt_template("classify_intent.txt")
+        human_content = f"""Conversation History:
     {history}
 
-    Current User Input: {user_input}""")
-        ])
-        
-        response = await self.llm_service.generate_response(prompt.format_messages())
+    Current User Input: {user_input}"""
+
+        response = await self.llm_service.generate_response(prompt.format_messages(input=human_content))
         intent = response.content.strip().lower().replace('"', '')
-        logger.info(f"Intent: {intent}")
+        self.tier_counts["llm"] += 1
+        logger.info(f"Intent: {intent} ({dict(self.tier_counts)})")
         
-        valid_intents = ["summarize_papers", "create_linkedin_from_position", "list_papers_by_date", "general_chat", "need_clarification", "modify_linkedin_post"]
-        return intent if intent in valid_intents else "need_clarification"
\ No newline at end of file
+        return intent if intent in VALID_INTENTS else "need_clarification"
+
+    async def classify_with_parameters(self, history: str, user_input: str) -> Optional[Tuple[str, Dict[str, Any]]]:
+        """Classify intent and extract parameters in one LLM call.
+
+        Returns None when the response is not valid JSON for a known intent,
+        so the caller can fall back to the two-call path.
+        """
+        logger.info("Entered IntentClassifierService.classify_with_parameters")
+
+        prompt = get_prompt_template("classify_and_extract.txt")
+        human_content = f"""Conversation History:
+{history}
+
+Current User Input: {user_input}"""
+
+        response = await self.llm_service.generate_response(prompt.format_messages(input=human_content))
+        content = response.content.strip().removeprefix("```json").removeprefix("```").removesuffix("```").strip()
+
+        try:
+            result = IntentResult.model_validate(json.loads(content))
+        except (json.JSONDecodeError, ValidationError) as e:
+            logger.info(f"Single-call routing failed, falling back: {e}")
+            return None
+
+        self.tier_counts["llm_single_call"] += 1
+        logger.info(f"Intent: {result.intent}, parameters: {result.parameters} ({dict(self.tier_counts)})")
+        return result.intent, result.parameters
\ No newline at end of file
@@ -0,0 +1,393 @@
+# services/job_service.py
+import json
+import time
+import uuid
+import asyncio
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+from pydantic import BaseModel
+
+from app.config.config import settings
+from app.config.logging import logger
+from app.services.downloader import DownloaderService
+from app.services.summarizer import NoPapersError, SummaryService
+
+JOB_KINDS = ("download", "summarize", "download_and_summarize")
+ACTIVE_STATUSES = ("queued", "running")
+# Active jobs that already do the work of a newly submitted kind
+COVERING_KINDS = {
+    "download": ("download", "download_and_summarize"),
+    "summarize": ("summarize", "download_and_summarize"),
+    "download_and_summarize": ("download_and_summarize",),
+}
+
+
+class Job(BaseModel):
+    id: str
+    kind: str
+    target_date: str
+    force: bool = False
+    status: str = "queued"  # queued, running, completed, failed, cancelled
+    completed: int = 0
+    total: Optional[int] = None
+    message: Optional[str] = None
+    result: Optional[Dict[str, Any]] = None
+    error: Optional[str] = None
+    created_at: float
+    updated_at: float
+
+
+class JobStore:
+    """SQLite persistence for job status and progress"""
+
+    COLUMNS = ("id", "kind", "target_date", "force", "status", "completed", "total",
+               "message", "result", "error", "created_at", "updated_at")
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS jobs (
+                id TEXT PRIMARY KEY,
+                kind TEXT NOT NULL,
+                target_date TEXT NOT NULL,
+                force INTEGER NOT NULL,
+                status TEXT NOT NULL,
+                completed INTEGER NOT NULL,
+                total INTEGER,
+                message TEXT,
+                result TEXT,
+                error TEXT,
+                created_at REAL NOT NULL,
+                updated_at REAL NOT NULL
+            )
+        """)
+        self._conn.execute("CREATE INDEX IF NOT EXISTS jobs_kind_date_status ON jobs (kind, target_date, status)")
+        self._conn.commit()
+
+    def _to_job(self, row) -> Job:
+        values = dict(zip(self.COLUMNS, row))
+        values["force"] = bool(values["force"])
+        values["result"] = json.loads(values["result"]) if values["result"] else None
+        return Job(**values)
+
+    def _values(self, job: Job) -> List[Any]:
+        values = job.model_dump()
+        values["force"] = int(values["force"])
+        values["result"] = json.dumps(values["result"]) if values["result"] is not None else None
+        return [values[column] for column in self.COLUMNS]
+
+    def insert(self, job: Job):
+        with self._lock:
+            self._conn.execute(
+                f"INSERT INTO jobs ({', '.join(self.COLUMNS)}) VALUES ({', '.join('?' for _ in self.COLUMNS)})",
+                self._values(job)
+            )
+            self._conn.commit()
+
+    @staticmethod
+    def _covering_filter(kind: str, target_date: str, force: bool) -> Tuple[str, List[Any]]:
+        """WHERE clause matching active jobs that do the work of a new job.
+
+        A force job is only covered by another force job.
+        """
+        kinds = COVERING_KINDS[kind]
+        clause = f"""kind IN ({', '.join('?' for _ in kinds)}) AND target_date = ?
+                     AND status IN ('queued', 'running') AND (force = 1 OR ? = 0)"""
+        return clause, [*kinds, target_date, int(force)]
+
+    def insert_unless_active(self, job: Job) -> bool:
+        """Insert the job unless an active job already covers its kind, date and force.
+
+        One statement, so concurrent worker processes cannot both insert.
+        """
+        clause, params = self._covering_filter(job.kind, job.target_date, job.force)
+        with self._lock:
+            cursor = self._conn.execute(
+                f"""INSERT INTO jobs ({', '.join(self.COLUMNS)})
+                    SELECT {', '.join('?' for _ in self.COLUMNS)}
+                    WHERE NOT EXISTS (SELECT 1 FROM jobs WHERE {clause})""",
+                [*self._values(job), *params]
+            )
+            self._conn.commit()
+        return cursor.rowcount == 1
+
+    def update(self, job_id: str, expected_status: Optional[str] = None, **fields: Any) -> bool:
+        """Update a job, only if it still has expected_status when that is given"""
+        if "result" in fields and fields["result"] is not None:
+            fields["result"] = json.dumps(fields["result"])
+        fields["updated_at"] = time.time()
+        assignments = ", ".join(f"{column} = ?" for column in fields)
+        query = f"UPDATE jobs SET {assignments} WHERE id = ?"
+        params = [*fields.values(), job_id]
+        if expected_status is not None:
+            query += " AND status = ?"
+            params.append(expected_status)
+        with self._lock:
+            cursor = self._conn.execute(query, params)
+            self._conn.commit()
+        return cursor.rowcount == 1
+
+    def cancel(self, job_id: str) -> bool:
+        with self._lock:
+            cursor = self._conn.execute(
+                "UPDATE jobs SET status = 'cancelled', updated_at = ? WHERE id = ? AND status IN ('queued', 'running')",
+                (time.time(), job_id)
+            )
+            self._conn.commit()
+        return cursor.rowcount == 1
+
+    def heartbeat(self, job_id: str) -> bool:
+        """Mark a running job as alive; False once it was cancelled or requeued elsewhere"""
+        return self.update(job_id, expected_status="running")
+
+    def claim(self, job_id: str) -> bool:
+        """Atomically move a queued job to running so only one worker process runs it.
+
+        Jobs for the same date share the papers and summaries folders, so a job
+        is not claimed while another one for its date is running.
+        """
+        with self._lock:
+            cursor = self._conn.execute(
+                """UPDATE jobs SET status = 'running', updated_at = ?
+                   WHERE id = ? AND status = 'queued'
+                     AND NOT EXISTS (
+                         SELECT 1 FROM jobs AS other
+                         WHERE other.target_date = jobs.target_date AND other.status = 'running'
+                     )""",
+                (time.time(), job_id)
+            )
+            self._conn.commit()
+        return cursor.rowcount == 1
+
+    def get(self, job_id: str) -> Optional[Job]:
+        with self._lock:
+            row = self._conn.execute(f"SELECT {', '.join(self.COLUMNS)} FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return self._to_job(row) if row else None
+
+    def find_active(self, kind: str, target_date: str, force: bool = False) -> Optional[Job]:
+        """The oldest active job for the date whose work includes the given kind (and force)"""
+        clause, params = self._covering_filter(kind, target_date, force)
+        with self._lock:
+            row = self._conn.execute(
+                f"""SELECT {', '.join(self.COLUMNS)} FROM jobs WHERE {clause}
+                    ORDER BY created_at LIMIT 1""",
+                params
+            ).fetchone()
+        return self._to_job(row) if row else None
+
+    def list_queued(self) -> List[str]:
+        with self._lock:
+            rows = self._conn.execute("SELECT id FROM jobs WHERE status = 'queued' ORDER BY created_at").fetchall()
+        return [row[0] for row in rows]
+
+    def requeue_stale(self, stale_before: float) -> List[str]:
+        """Requeue jobs nobody has touched since stale_before, returning their ids.
+
+        Running jobs are heartbeated by their worker, so a stale one belongs to a
+        dead process. The update is conditional, so each stale job is requeued once.
+        """
+        with self._lock:
+            rows = self._conn.execute(
+                """UPDATE jobs SET status = 'queued', updated_at = ?
+                   WHERE status IN ('queued', 'running') AND updated_at < ?
+                   RETURNING id""",
+                (time.time(), stale_before)
+            ).fetchall()
+            self._conn.commit()
+        return [row[0] for row in rows]
+
+
+class JobProgressWriter:
+    """Progress callback that coalesces events and writes the latest state off the event loop.
+
+    At most one write per interval reaches SQLite; close() writes whatever is left.
+    """
+
+    def __init__(self, store: JobStore, job_id: str, interval_seconds: float):
+        self.store = store
+        self.job_id = job_id
+        self.interval_seconds = interval_seconds
+        self._pending: Dict[str, Any] = {}
+        self._task: Optional[asyncio.Task] = None
+        self._closed = asyncio.Event()
+
+    def __call__(self, event: Dict[str, Any]):
+        self._pending["message"] = event["event"]
+        if "completed" in event:
+            self._pending["completed"] = event["completed"]
+        if event.get("total") is not None:
+            self._pending["total"] = event["total"]
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._flush())
+
+    async def _flush(self):
+        while self._pending:
+            fields, self._pending = self._pending, {}
+            await asyncio.to_thread(self.store.update, self.job_id, **fields)
+            if not self._closed.is_set():
+                try:
+                    await asyncio.wait_for(self._closed.wait(), self.interval_seconds)
+                except asyncio.TimeoutError:
+                    pass
+
+    async def close(self):
+        self._closed.set()
+        if self._task:
+            await self._task
+
+
+class JobService:
+    """Runs download and summarize work in the background with persisted progress"""
+
+    def __init__(
+        self,
+        downloader_service: DownloaderService,
+        summary_service: SummaryService,
+        store: Optional[JobStore] = None,
+        workers: int = settings.JOB_WORKERS
+    ):
+        self.downloader_service = downloader_service
+        self.summary_service = summary_service
+        self.store = store or JobStore(Path(settings.JOB_DB_PATH))
+        self.workers = workers
+        self._queue: asyncio.Queue = asyncio.Queue()
+        self._worker_tasks: List[asyncio.Task] = []
+        self._running: Dict[str, asyncio.Task] = {}
+
+    async def start(self):
+        """Start the workers and resume jobs left unfinished by a previous process"""
+        await self._requeue_stale()
+        for job_id in await asyncio.to_thread(self.store.list_queued):
+            self._queue.put_nowait(job_id)
+
+        self._worker_tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+        self._worker_tasks.append(asyncio.create_task(self._heartbeat()))
+
+    async def stop(self):
+        for task in self._worker_tasks:
+            task.cancel()
+        await asyncio.gather(*self._worker_tasks, return_exceptions=True)
+        self._worker_tasks = []
+
+    async def submit(self, kind: str, target_date: str, force: bool = False) -> Job:
+        """Queue a job, returning the already active job covering the same kind and date if there is one.
+
+        A force job is only deduplicated against another force job; it otherwise
+        queues behind the active job for its date and runs after it.
+        """
+        if kind not in JOB_KINDS:
+            raise ValueError(f"Unknown job kind: {kind}")
+
+        while True:
+            now = time.time()
+            job = Job(id=str(uuid.uuid4()), kind=kind, target_date=target_date, force=force, created_at=now, updated_at=now)
+            if await asyncio.to_thread(self.store.insert_unless_active, job):
+                break
+            active = await asyncio.to_thread(self.store.find_active, kind, target_date, force)
+            if active:
+                logger.info(f"Reusing active job {active.id} for {kind} {target_date}")
+                return active
+            # The active job finished in between; try inserting again
+
+        self._queue.put_nowait(job.id)
+        logger.info(f"Queued job {job.id} ({kind} {target_date})")
+        return job
+
+    async def get(self, job_id: str) -> Optional[Job]:
+        return await asyncio.to_thread(self.store.get, job_id)
+
+    async def cancel(self, job_id: str) -> Optional[Job]:
+        """Cancel a queued or running job.
+
+        A job running in another worker process stops at its next heartbeat.
+        """
+        if await asyncio.to_thread(self.store.cancel, job_id):
+            task = self._running.get(job_id)
+            if task:
+                task.cancel()
+        return await self.get(job_id)
+
+    async def _requeue_stale(self):
+        stale_before = time.time() - settings.JOB_STALE_SECONDS
+        for job_id in await asyncio.to_thread(self.store.requeue_stale, stale_before):
+            logger.info(f"Resuming stale job {job_id}")
+            self._queue.put_nowait(job_id)
+
+    async def _heartbeat(self):
+        """Keep local running jobs fresh, stop those cancelled elsewhere, and resume stale ones"""
+        while True:
+            await asyncio.sleep(settings.JOB_HEARTBEAT_SECONDS)
+            try:
+                for job_id, task in list(self._running.items()):
+                    if not await asyncio.to_thread(self.store.heartbeat, job_id):
+                        logger.info(f"Job {job_id} is no longer running in the store; stopping it")
+                        task.cancel()
+                await self._requeue_stale()
+            except Exception as e:
+                logger.error(f"Job heartbeat failed: {str(e)}")
+
+    async def _worker(self):
+        while True:
+            job_id = await self._queue.get()
+            # Skips jobs cancelled while queued or claimed by another worker process
+            if not await asyncio.to_thread(self.store.claim, job_id):
+                job = await self.get(job_id)
+                if job and job.status == "queued":
+                    # Another job for the same date is running; try again later
+                    asyncio.get_running_loop().call_later(
+                        settings.JOB_RETRY_SECONDS, self._queue.put_nowait, job_id
+                    )
+                continue
+
+            job = await self.get(job_id)
+            task = asyncio.create_task(self._run(job))
+            self._running[job_id] = task
+            try:
+                result = await task
+                # Conditional, so a job cancelled or requeued meanwhile is not marked completed
+                if not await asyncio.to_thread(
+                    self.store.update, job_id, expected_status="running",
+                    status="completed", result=result, message=result.get("message")
+                ):
+                    logger.info(f"Job {job_id} finished after it was cancelled or requeued; result discarded")
+            except asyncio.CancelledError:
+                if asyncio.current_task().cancelling():
+                    # The worker itself is stopping; leave the job to be resumed
+                    raise
+                logger.info(f"Job {job_id} cancelled")
+            except Exception as e:
+                logger.error(f"Job {job_id} failed: {str(e)}")
+                await asyncio.to_thread(self.store.update, job_id, expected_status="running", status="failed", error=str(e))
+            finally:
+                self._running.pop(job_id, None)
+
+    async def _run(self, job: Job) -> Dict[str, Any]:
+        on_progress = JobProgressWriter(self.store, job.id, settings.JOB_PROGRESS_INTERVAL_SECONDS)
+
+        result: Dict[str, Any] = {}
+        try:
+            if job.kind in ("download", "download_and_summarize"):
+                result["download"] = await self.downloader_service.download_papers(job.target_date, progress_callback=on_progress)
+                result["message"] = result["download"]
+
+            if job.kind in ("summarize", "download_and_summarize"):
+                try:
+                    paper_ids, response_msg = await self.summary_service.summarize_papers_for_date(
+                        job.target_date, force=job.force, progress_callback=on_progress
+                    )
+                except NoPapersError as e:
+                    # Nothing published (yet) for the date is an outcome, not a failure
+                    paper_ids, response_msg = [], str(e)
+                    result["no_papers"] = True
+                result["paper_ids"] = paper_ids
+                result["message"] = response_msg
+        finally:
+            await on_progress.close()
+
+        return result
@@ -7,7 +7,10 @@ from langchain_core.messages import SystemMessage, HumanMessage, AIMessage
 from app.services.llm import LLMService
 from app.services.database import DatabaseService, LinkedInPost
 from app.config.logging import logger
-from app.utils.utils import retrieve_prompt
+from app.config.config import settings
+from app.utils.utils import get_prompt_template, retrieve_prompt
+from app.utils.singleflight import SingleFlight
+from app.utils.sections import LINKEDIN_SECTIONS, select_content
 
 
 class LinkedInService:
@@ -16,6 +19,7 @@ class LinkedInService:
     def __init__(self, llm_service: LLMService, database_service: DatabaseService):
         self.llm_service = llm_service
         self.database_service = database_service
+        self._in_flight = SingleFlight("linkedin posts")
 
     async def create_post_for_paper_by_position(
         self, 
@@ -23,7 +27,10 @@ class LinkedInService:
     ) -> str:
         """Create LinkedIn post for a paper by position using database"""
         logger.info("Entered LinkedInService.create_post_for_paper_by_position")
-        
+        # Concurrent requests for the same paper share one generated post
+        return await self._in_flight.do(("linkedin", paper_id), self._create_post_for_paper, paper_id)
+
+    async def _create_post_for_paper(self, paper_id: int) -> str:
         paper = await self.database_service.get_paper_by_id(paper_id)        
         if not paper:
             raise ValueError(f"No paper found id: {paper_id}")
@@ -58,13 +65,11 @@ class LinkedInService:
     async def _generate_linkedin_post(self, detailed_summary: str) -> str:
         """Generate LinkedIn post from detailed summary"""
 
-        system_prompt_content = retrieve_prompt("generate_linkedin_post.txt")
-        prompt = ChatPromptTemplate.from_messages([
-            SystemMessage(content=system_prompt_content),
-            HumanMessage(content=f"Detailed Summary:\n{detailed_summary[:1000]}...")
-        ])
+        prompt = get_prompt_template("generate_linkedin_post.txt")
+        content = select_content(detailed_summary, settings.LINKEDIN_TOKEN_BUDGET, LINKEDIN_SECTIONS)
+        human_content = f"Detailed Summary:\n{content}"
         
-        response = await self.llm_service.generate_response(prompt.format_messages())
+        response = await self.llm_service.generate_response(prompt.format_messages(input=human_content))
         return response.content
     
     async def _modify_linkedin_post(self, post: str, user_request: str): 
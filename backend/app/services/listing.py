@@ -14,13 +14,13 @@ class PaperListingService:
         """List available papers for a given date"""
         logger.info("Entered PaperListingService._retrieve_papers_by_date")
         
-        papers = await self.database_service.get_papers_by_date(target_date)
+        papers = await self.database_service.get_paper_titles_by_date(target_date)
         processed_papers_ids = []
         processed_papers_title = []
 
-        for paper in papers:
-            processed_papers_ids.append(paper.id)
-            processed_papers_title.append(paper.title)
+        for paper_id, title in papers:
+            processed_papers_ids.append(paper_id)
+            processed_papers_title.append(title)
         response_msg = f"\n\nAvailable papers for the date {target_date}:"
         if processed_papers_title:
             for idx, title in enumerate(processed_papers_title, start=1):
@@ -1,24 +1,98 @@
-from langchain_community.chat_models import ChatOllama
-from langchain_core.messages import HumanMessage, SystemMessage
+from langchain_ollama import ChatOllama
+from langchain_core.messages import HumanMessage, SystemMessage, AIMessage
 from langchain_core.prompts import ChatPromptTemplate
 import json
+from typing import Any, Dict, List, Optional
 from app.config.logging import logger
 from app.config.config import settings
-from app.utils.utils import retrieve_prompt
+from app.utils.utils import get_prompt_template
+from app.services.llm_cache import LLMCache, build_llm_cache
+from app.utils.singleflight import SingleFlight
+from app.services.llm_pool import LLMEndpoint, LLMEndpointPool
+from app.services.llm_scheduler import LLMAdmissionQueue, Priority
 
 class LLMService:
     """Service for the LLM interactions"""
 
-    def __init__(self):
+    def __init__(
+        self,
+        cache: Optional[LLMCache] = None,
+        endpoints: Optional[List[str]] = None,
+        pool: Optional[LLMEndpointPool] = None
+    ):
         self.model_name = settings.MODEL_NAME
         self.temperature = settings.TEMPERATURE
 
-        self.llm = ChatOllama(model=self.model_name, temperature=self.temperature)
+        endpoints = endpoints or [url.strip() for url in settings.LLM_ENDPOINTS.split(",") if url.strip()]
+        self.llm = pool or LLMEndpointPool([self._create_endpoint(base_url) for base_url in endpoints])
+        # Interactive calls are admitted ahead of batch summarization
+        self.admission = LLMAdmissionQueue(self.llm.capacity)
+        self.cache = cache if cache is not None else build_llm_cache()
+        self._in_flight = SingleFlight("llm calls")
 
-    async def generate_response(self, prompt):
+    def _create_endpoint(self, base_url: str) -> LLMEndpoint:
+        # Each client keeps a pooled keep-alive HTTP connection to its server
+        llm = ChatOllama(
+            model=self.model_name,
+            temperature=self.temperature,
+            base_url=base_url,
+            client_kwargs={"timeout": settings.LLM_REQUEST_TIMEOUT_SECONDS}
+        )
+        return LLMEndpoint(base_url, llm, settings.LLM_ENDPOINT_MAX_CONCURRENCY)
+
+    async def start(self):
+        await self.llm.start()
+
+    async def stop(self):
+        await self.llm.stop()
+
+    async def generate_response(self, prompt, use_cache: bool = True, priority: Priority = Priority.INTERACTIVE):
+        """Generate a response, serving repeated prompts from the cache.
+
+        Only deterministic (temperature 0) calls are cached unless
+        LLM_CACHE_NONDETERMINISTIC is set; use_cache=False bypasses the cache.
+        Bulk work should pass Priority.BATCH so chat turns are served first.
+        """
         logger.info("Entered llm generate_response")
-        response = await self.llm.ainvoke(prompt)
+
+        cacheable = use_cache and self.cache is not None and (
+            self.temperature == 0 or settings.LLM_CACHE_NONDETERMINISTIC
+        )
+        if not cacheable:
+            return await self._invoke(prompt, priority)
+
+        cache_key = LLMCache.make_key(self.model_name, self.temperature, prompt)
+        cached_content = await self.cache.get(cache_key)
+        if cached_content is not None:
+            logger.info(f"LLM cache hit ({self.cache.stats()})")
+            return AIMessage(content=cached_content)
+
+        # Identical cacheable prompts issued concurrently share one model call
+        return await self._in_flight.do(cache_key, self._invoke_and_cache, prompt, cache_key, priority)
+
+    async def run_on_endpoint(self, call, priority: Priority = Priority.BATCH):
+        """Run a non-chat request, such as embeddings, under the same admission and balancing.
+
+        call receives the chosen LLMEndpoint and returns the awaitable request.
+        """
+        async with self.admission.slot(priority):
+            return await self.llm.run(call)
+
+    async def _invoke(self, prompt, priority: Priority):
+        async with self.admission.slot(priority):
+            return await self.llm.ainvoke(prompt)
+
+    async def _invoke_and_cache(self, prompt, cache_key: str, priority: Priority):
+        response = await self._invoke(prompt, priority)
+        await self.cache.set(cache_key, response.content)
         return response
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "admission": self.admission.stats(),
+            "endpoints": self.llm.stats(),
+            "cache": self.cache.stats() if self.cache else None,
+        }
     
         
 
@@ -26,16 +100,13 @@ class LLMService:
         """Generate general chat response"""
         logger.info("Entered generate_general_response")
 
-        system_prompt_content = retrieve_prompt("generate_general_response.txt")
-        prompt = ChatPromptTemplate.from_messages([
-            SystemMessage(content=system_prompt_content),
-            HumanMessage(content=f"""Conversation Context:
+        prompt = get_prompt_template("generate_general_response.txt")
+        human_content = f"""Conversation Context:
 {conversation_context}
 
-Current User Input: {user_input}""")
-        ])
+Current User Input: {user_input}"""
         
-        response = await self.llm.ainvoke(prompt.format_messages())
+        response = await self.generate_response(prompt.format_messages(input=human_content), priority=Priority.INTERACTIVE)
         logger.info("generate_general_response")
         logger.info(response)
         return response.content
\ No newline at end of file
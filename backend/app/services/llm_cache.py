@@ -0,0 +1,158 @@
+import json
+import time
+import asyncio
+import sqlite3
+import hashlib
+import threading
+from abc import ABC, abstractmethod
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence
+
+from langchain_core.messages import BaseMessage
+
+from app.config.logging import logger
+from app.config.config import settings
+from app.utils.lru import TTLLRUCache
+
+
+class CacheTier(ABC):
+    """A storage level of the LLM response cache"""
+
+    name = "tier"
+    # Blocking tiers are called from a worker thread
+    blocking = False
+
+    @abstractmethod
+    def get(self, key: str) -> Optional[str]:
+        ...
+
+    @abstractmethod
+    def set(self, key: str, value: str):
+        ...
+
+
+class MemoryCacheTier(CacheTier):
+    """Process-local LRU tier"""
+
+    name = "memory"
+
+    def __init__(self, max_entries: int, ttl_seconds: Optional[float] = None):
+        self._cache = TTLLRUCache(max_entries, ttl_seconds)
+
+    def get(self, key: str) -> Optional[str]:
+        return self._cache.get(key)
+
+    def set(self, key: str, value: str):
+        self._cache.set(key, value)
+
+
+class SQLiteCacheTier(CacheTier):
+    """On-disk tier that survives restarts"""
+
+    name = "sqlite"
+    blocking = True
+
+    def __init__(self, path: Path, max_entries: int, ttl_seconds: Optional[float] = None):
+        self.path = Path(path)
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS llm_cache (
+                key TEXT PRIMARY KEY,
+                value TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                accessed_at REAL NOT NULL
+            )
+        """)
+        self._conn.execute("CREATE INDEX IF NOT EXISTS llm_cache_accessed_at ON llm_cache (accessed_at)")
+        self._conn.commit()
+
+    def get(self, key: str) -> Optional[str]:
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute("SELECT value, created_at FROM llm_cache WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            value, created_at = row
+            if self.ttl_seconds is not None and now - created_at > self.ttl_seconds:
+                self._conn.execute("DELETE FROM llm_cache WHERE key = ?", (key,))
+                self._conn.commit()
+                return None
+            self._conn.execute("UPDATE llm_cache SET accessed_at = ? WHERE key = ?", (now, key))
+            self._conn.commit()
+            return value
+
+    def set(self, key: str, value: str):
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO llm_cache (key, value, created_at, accessed_at) VALUES (?, ?, ?, ?)",
+                (key, value, now, now)
+            )
+            # Drop the least recently used rows beyond the size bound
+            self._conn.execute("""
+                DELETE FROM llm_cache WHERE key IN (
+                    SELECT key FROM llm_cache ORDER BY accessed_at DESC LIMIT -1 OFFSET ?
+                )
+            """, (self.max_entries,))
+            self._conn.commit()
+
+
+class LLMCache:
+    """Tiered cache of LLM responses keyed on model settings and prompt messages"""
+
+    def __init__(self, tiers: List[CacheTier]):
+        self.tiers = tiers
+        self.hits: Dict[str, int] = {tier.name: 0 for tier in tiers}
+        self.misses = 0
+
+    @staticmethod
+    def make_key(model_name: str, temperature: float, messages: Sequence[BaseMessage]) -> str:
+        payload = json.dumps(
+            [(message.type, message.content) for message in messages],
+            ensure_ascii=False
+        )
+        messages_hash = hashlib.sha256(payload.encode("utf-8")).hexdigest()
+        return f"{model_name}|{temperature}|{messages_hash}"
+
+    async def _call(self, tier: CacheTier, method: str, *args):
+        if tier.blocking:
+            return await asyncio.to_thread(getattr(tier, method), *args)
+        return getattr(tier, method)(*args)
+
+    async def get(self, key: str) -> Optional[str]:
+        for index, tier in enumerate(self.tiers):
+            value = await self._call(tier, "get", key)
+            if value is not None:
+                self.hits[tier.name] += 1
+                # Promote into the faster tiers
+                for upper_tier in self.tiers[:index]:
+                    await self._call(upper_tier, "set", key, value)
+                return value
+        self.misses += 1
+        return None
+
+    async def set(self, key: str, value: str):
+        for tier in self.tiers:
+            await self._call(tier, "set", key, value)
+
+    def stats(self) -> Dict[str, int]:
+        return {**{f"{name}_hits": hits for name, hits in self.hits.items()}, "misses": self.misses}
+
+
+def build_llm_cache() -> Optional[LLMCache]:
+    """Build the response cache configured in settings"""
+    if not settings.LLM_CACHE_ENABLED:
+        return None
+
+    ttl_seconds = settings.LLM_CACHE_TTL_SECONDS or None
+    tiers: List[CacheTier] = [MemoryCacheTier(settings.LLM_CACHE_MAX_ENTRIES, ttl_seconds)]
+    if settings.LLM_CACHE_SQLITE_PATH:
+        tiers.append(SQLiteCacheTier(Path(settings.LLM_CACHE_SQLITE_PATH), settings.LLM_CACHE_SQLITE_MAX_ENTRIES, ttl_seconds))
+
+    logger.info(f"LLM response cache enabled with tiers: {[tier.name for tier in tiers]}")
+    return LLMCache(tiers)
@@ -0,0 +1,153 @@
+import asyncio
+import aiohttp
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set
+
+from app.config.config import settings
+from app.config.logging import logger
+
+
+class LLMEndpoint:
+    """One model server with its own client, concurrency cap and health state"""
+
+    def __init__(self, base_url: str, llm: Any, max_concurrency: int):
+        self.base_url = base_url.rstrip("/")
+        self.llm = llm
+        self.max_concurrency = max_concurrency
+        self.semaphore = asyncio.Semaphore(max_concurrency)
+        # Requests assigned to this endpoint, including those waiting for a slot
+        self.outstanding = 0
+        self.healthy = True
+        self.consecutive_failures = 0
+        self.requests = 0
+        self.failures = 0
+
+    def load(self) -> float:
+        return self.outstanding / self.max_concurrency
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "healthy": self.healthy,
+            "outstanding": self.outstanding,
+            "requests": self.requests,
+            "failures": self.failures,
+        }
+
+
+HealthCheck = Callable[[LLMEndpoint], Awaitable[bool]]
+
+
+class LLMEndpointPool:
+    """Spreads LLM calls over several endpoints using least-outstanding-requests balancing.
+
+    Endpoints are ejected after repeated failures and re-admitted once a
+    health check succeeds. Exposes ainvoke so it can stand in for a chat model.
+    """
+
+    def __init__(
+        self,
+        endpoints: List[LLMEndpoint],
+        failure_threshold: int = settings.LLM_EJECT_AFTER_FAILURES,
+        health_check_interval_seconds: float = settings.LLM_HEALTH_CHECK_INTERVAL_SECONDS,
+        health_check: Optional[HealthCheck] = None
+    ):
+        if not endpoints:
+            raise ValueError("At least one LLM endpoint is required")
+        self.endpoints = endpoints
+        self.failure_threshold = failure_threshold
+        self.health_check_interval_seconds = health_check_interval_seconds
+        self.health_check = health_check or self._http_health_check
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._health_task: Optional[asyncio.Task] = None
+
+    @property
+    def capacity(self) -> int:
+        return sum(endpoint.max_concurrency for endpoint in self.endpoints)
+
+    async def start(self):
+        if self._health_task is None and self.health_check_interval_seconds > 0:
+            self._health_task = asyncio.create_task(self._health_loop())
+
+    async def stop(self):
+        if self._health_task:
+            self._health_task.cancel()
+            await asyncio.gather(self._health_task, return_exceptions=True)
+            self._health_task = None
+        if self._session:
+            await self._session.close()
+            self._session = None
+
+    def _pick(self, exclude: Set[int]) -> Optional[LLMEndpoint]:
+        candidates = [endpoint for endpoint in self.endpoints if id(endpoint) not in exclude]
+        healthy = [endpoint for endpoint in candidates if endpoint.healthy]
+        # With every endpoint ejected, keep trying rather than failing outright
+        candidates = healthy or candidates
+        if not candidates:
+            return None
+        return min(candidates, key=lambda endpoint: endpoint.load())
+
+    async def ainvoke(self, prompt, **kwargs):
+        return await self.run(lambda endpoint: endpoint.llm.ainvoke(prompt, **kwargs))
+
+    async def run(self, call: Callable[[LLMEndpoint], Awaitable[Any]]) -> Any:
+        """Run a request on the least loaded endpoint, failing over to the others"""
+        tried: Set[int] = set()
+        while True:
+            endpoint = self._pick(tried)
+            if endpoint is None:
+                raise RuntimeError("No LLM endpoint available")
+            tried.add(id(endpoint))
+
+            endpoint.outstanding += 1
+            endpoint.requests += 1
+            try:
+                async with endpoint.semaphore:
+                    response = await call(endpoint)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self._record_failure(endpoint, e)
+                if len(tried) == len(self.endpoints):
+                    raise
+                continue
+            finally:
+                endpoint.outstanding -= 1
+
+            endpoint.consecutive_failures = 0
+            return response
+
+    def _record_failure(self, endpoint: LLMEndpoint, error: Exception):
+        endpoint.failures += 1
+        endpoint.consecutive_failures += 1
+        logger.warning(f"LLM endpoint {endpoint.base_url} failed: {error!r}")
+        if endpoint.healthy and endpoint.consecutive_failures >= self.failure_threshold:
+            endpoint.healthy = False
+            logger.error(f"⛔ Ejected LLM endpoint {endpoint.base_url}")
+
+    async def _health_loop(self):
+        while True:
+            await asyncio.sleep(self.health_check_interval_seconds)
+            await self.check_health()
+
+    async def check_health(self):
+        results = await asyncio.gather(
+            *(self.health_check(endpoint) for endpoint in self.endpoints),
+            return_exceptions=True
+        )
+        for endpoint, ok in zip(self.endpoints, results):
+            ok = ok is True
+            if ok and not endpoint.healthy:
+                logger.info(f"✅ Re-admitted LLM endpoint {endpoint.base_url}")
+            elif not ok and endpoint.healthy:
+                logger.error(f"⛔ Ejected LLM endpoint {endpoint.base_url} after failed health check")
+            endpoint.healthy = ok
+            if ok:
+                endpoint.consecutive_failures = 0
+
+    async def _http_health_check(self, endpoint: LLMEndpoint) -> bool:
+        if self._session is None:
+            self._session = aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=5))
+        async with self._session.get(f"{endpoint.base_url}/api/tags") as resp:
+            return resp.status == 200
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        return {endpoint.base_url: endpoint.stats() for endpoint in self.endpoints}
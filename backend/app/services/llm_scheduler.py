@@ -0,0 +1,108 @@
+import time
+import asyncio
+from collections import deque
+from contextlib import asynccontextmanager
+from enum import IntEnum
+from typing import Any, Deque, Dict, Tuple
+
+from app.config.config import settings
+
+
+class Priority(IntEnum):
+    """Admission priority of an LLM call; lower values are served first"""
+    INTERACTIVE = 0
+    BATCH = 1
+
+
+class LLMAdmissionQueue:
+    """Admits LLM calls up to the backend capacity, serving interactive calls before batch ones.
+
+    A batch call that has waited longer than batch_max_wait_seconds is admitted
+    ahead of interactive calls so bulk work is never starved.
+    """
+
+    def __init__(self, capacity: int, batch_max_wait_seconds: float = settings.LLM_BATCH_MAX_WAIT_SECONDS):
+        self.capacity = capacity
+        self.batch_max_wait_seconds = batch_max_wait_seconds
+        self.active = 0
+        self._waiters: Dict[Priority, Deque[Tuple[float, asyncio.Future]]] = {priority: deque() for priority in Priority}
+        self._admitted = {priority: 0 for priority in Priority}
+        self._total_wait = {priority: 0.0 for priority in Priority}
+        self._max_wait = {priority: 0.0 for priority in Priority}
+
+    @asynccontextmanager
+    async def slot(self, priority: Priority = Priority.INTERACTIVE):
+        await self.acquire(priority)
+        try:
+            yield
+        finally:
+            self.release()
+
+    async def acquire(self, priority: Priority = Priority.INTERACTIVE):
+        enqueued_at = time.monotonic()
+        if self.active < self.capacity and not any(self._waiters.values()):
+            self.active += 1
+            self._record_wait(priority, enqueued_at)
+            return
+
+        future = asyncio.get_running_loop().create_future()
+        entry = (enqueued_at, future)
+        self._waiters[priority].append(entry)
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                # Granted just before the cancellation landed; hand the slot on
+                self.release()
+            else:
+                try:
+                    self._waiters[priority].remove(entry)
+                except ValueError:
+                    pass
+            raise
+
+    def release(self):
+        self.active -= 1
+        self._grant_next()
+
+    def _grant_next(self):
+        while self.active < self.capacity:
+            priority = self._next_priority()
+            if priority is None:
+                return
+            enqueued_at, future = self._waiters[priority].popleft()
+            if future.cancelled():
+                continue
+            self.active += 1
+            self._record_wait(priority, enqueued_at)
+            future.set_result(None)
+
+    def _next_priority(self):
+        batch_waiters = self._waiters[Priority.BATCH]
+        if batch_waiters and time.monotonic() - batch_waiters[0][0] >= self.batch_max_wait_seconds:
+            return Priority.BATCH
+        for priority in Priority:
+            if self._waiters[priority]:
+                return priority
+        return None
+
+    def _record_wait(self, priority: Priority, enqueued_at: float):
+        waited = time.monotonic() - enqueued_at
+        self._admitted[priority] += 1
+        self._total_wait[priority] += waited
+        self._max_wait[priority] = max(self._max_wait[priority], waited)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "capacity": self.capacity,
+            "active": self.active,
+            **{
+                priority.name.lower(): {
+                    "queued": len(self._waiters[priority]),
+                    "admitted": self._admitted[priority],
+                    "avg_wait_seconds": round(self._total_wait[priority] / self._admitted[priority], 3) if self._admitted[priority] else 0.0,
+                    "max_wait_seconds": round(self._max_wait[priority], 3),
+                }
+                for priority in Priority
+            },
+        }
@@ -0,0 +1,102 @@
+from dataclasses import dataclass
+from typing import List, Tuple
+
+from app.config.logging import logger
+
+# Arbitrary key for pg_advisory_lock so concurrent workers migrate one at a time
+MIGRATION_LOCK_ID = 724_100_311
+
+
+@dataclass(frozen=True)
+class Migration:
+    version: int
+    name: str
+    statements: Tuple[str, ...]
+
+
+# Append new migrations with the next version number; never edit one that has shipped
+MIGRATIONS: List[Migration] = [
+    Migration(1, "create papers and linkedin_posts", (
+        # IF NOT EXISTS lets databases created before migrations adopt this baseline
+        """
+        CREATE TABLE IF NOT EXISTS papers (
+            id SERIAL PRIMARY KEY,
+            title TEXT UNIQUE NOT NULL,
+            abstract TEXT NOT NULL,
+            key_findings JSONB NOT NULL,
+            methodology TEXT NOT NULL,
+            significance TEXT NOT NULL,
+            paper_path TEXT NOT NULL,
+            summary_path TEXT NOT NULL,
+            timestamp TIMESTAMPTZ NOT NULL
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS linkedin_posts (
+            id SERIAL PRIMARY KEY,
+            title TEXT NOT NULL,
+            post TEXT NOT NULL,
+            FOREIGN KEY (title) REFERENCES papers(title) ON DELETE CASCADE
+        )
+        """,
+    )),
+    Migration(2, "add summary staleness columns", (
+        """
+        ALTER TABLE papers
+            ADD COLUMN IF NOT EXISTS content_hash TEXT,
+            ADD COLUMN IF NOT EXISTS prompt_version TEXT
+        """,
+    )),
+    Migration(3, "index paper lookups", (
+        # Date listings are range scans ordered newest first
+        "CREATE INDEX IF NOT EXISTS idx_papers_timestamp ON papers (timestamp DESC)",
+        # get_paper_by_path takes the newest row for a PDF
+        "CREATE INDEX IF NOT EXISTS idx_papers_paper_path ON papers (paper_path, id DESC)",
+        # Foreign keys are not indexed automatically; deleting a paper scans its posts
+        "CREATE INDEX IF NOT EXISTS idx_linkedin_posts_title ON linkedin_posts (title)",
+    )),
+    Migration(4, "full-text search over papers", (
+        # Title matches rank above abstract matches, which rank above findings and methodology
+        """
+        ALTER TABLE papers ADD COLUMN IF NOT EXISTS search_vector tsvector
+            GENERATED ALWAYS AS (
+                setweight(to_tsvector('english', coalesce(title, '')), 'A')
+                || setweight(to_tsvector('english', coalesce(abstract, '')), 'B')
+                || setweight(jsonb_to_tsvector('english', coalesce(key_findings, '[]'::jsonb), '["string"]'), 'C')
+                || setweight(to_tsvector('english', coalesce(methodology, '')), 'C')
+            ) STORED
+        """,
+        "CREATE INDEX IF NOT EXISTS idx_papers_search_vector ON papers USING GIN (search_vector)",
+    )),
+]
+
+
+async def run_migrations(conn, migrations: List[Migration] = MIGRATIONS) -> int:
+    """Apply pending migrations in order, each in its own transaction.
+
+    Returns the number of migrations applied.
+    """
+    await conn.execute("SELECT pg_advisory_lock($1)", MIGRATION_LOCK_ID)
+    try:
+        await conn.execute("""
+            CREATE TABLE IF NOT EXISTS schema_migrations (
+                version INTEGER PRIMARY KEY,
+                name TEXT NOT NULL,
+                applied_at TIMESTAMPTZ NOT NULL DEFAULT now()
+            )
+        """)
+        applied = {row['version'] for row in await conn.fetch("SELECT version FROM schema_migrations")}
+
+        pending = [m for m in sorted(migrations, key=lambda m: m.version) if m.version not in applied]
+        for migration in pending:
+            logger.info(f"🗄️ Applying migration {migration.version}: {migration.name}")
+            async with conn.transaction():
+                for statement in migration.statements:
+                    await conn.execute(statement)
+                await conn.execute(
+                    "INSERT INTO schema_migrations (version, name) VALUES ($1, $2)",
+                    migration.version, migration.name
+                )
+        return len(pending)
+    finally:
+        await conn.execute("SELECT pg_advisory_unlock($1)", MIGRATION_LOCK_ID)
@@ -5,7 +5,7 @@ from langchain_core.prompts import ChatPromptTemplate
 
 from app.config.logging import logger
 from app.services.llm import LLMService
-from app.utils.utils import retrieve_prompt
+from app.utils.utils import get_prompt_template
 
 class ParameterExtractorService:
     def __init__(self, llm_service: LLMService):
@@ -15,16 +15,13 @@ class ParameterExtractorService:
         """Extract parameters from user input based on intent"""
         logger.info("Entered ParameterExtractorService.extract_parameters")
 
-        system_prompt_content = retrieve_prompt("extract_parameters.txt")
-        prompt = ChatPromptTemplate.from_messages([
-            SystemMessage(content=system_prompt_content),
-            HumanMessage(content=f"""Conversation History:
+        prompt = get_prompt_template("extract_parameters.txt")
+        human_content = f"""Conversation History:
 {history}
 
-Current User Input: {user_input}""")
-        ])
+Current User Input: {user_input}"""
         
-        response = await self.llm_service.generate_response(prompt.format_messages())
+        response = await self.llm_service.generate_response(prompt.format_messages(input=human_content))
 
         try:
             return json.loads(response.content.strip())
@@ -0,0 +1,156 @@
+# services/scheduler_service.py
+import os
+import asyncio
+from pathlib import Path
+from datetime import date, datetime, time, timedelta
+from typing import Dict, List, Optional, Tuple
+
+from app.config.config import settings
+from app.config.logging import logger
+from app.services.jobs import ACTIVE_STATUSES, JobService
+from app.utils.process_lock import ProcessLock
+
+
+def parse_windows(windows: str) -> List[Tuple[time, time]]:
+    """Parse "HH:MM-HH:MM" windows separated by commas; a window may cross midnight"""
+    parsed = []
+    for window in filter(None, (part.strip() for part in windows.split(","))):
+        start, end = (datetime.strptime(value.strip(), "%H:%M").time() for value in window.split("-"))
+        parsed.append((start, end))
+    return parsed
+
+
+class PrefetchScheduler:
+    """Downloads and pre-summarizes recent HF daily papers during off-hours"""
+
+    def __init__(
+        self,
+        job_service: JobService,
+        windows: str = settings.PREFETCH_WINDOWS,
+        days_back: int = settings.PREFETCH_DAYS_BACK,
+        include_today: bool = settings.PREFETCH_INCLUDE_TODAY,
+        max_concurrent_jobs: int = settings.PREFETCH_MAX_CONCURRENT_JOBS,
+        check_interval_seconds: float = settings.PREFETCH_CHECK_INTERVAL_SECONDS,
+        retry_base_seconds: float = settings.PREFETCH_RETRY_BASE_SECONDS,
+        max_attempts_per_day: int = settings.PREFETCH_MAX_ATTEMPTS_PER_DAY,
+        lock_path: Path = Path(settings.PREFETCH_LOCK_PATH)
+    ):
+        self.job_service = job_service
+        self.windows = parse_windows(windows)
+        self.days_back = days_back
+        self.include_today = include_today
+        self.max_concurrent_jobs = max_concurrent_jobs
+        self.check_interval_seconds = check_interval_seconds
+        self.retry_base_seconds = retry_base_seconds
+        self.max_attempts_per_day = max_attempts_per_day
+        # Day on which each target date was last prefetched, and the jobs still in flight
+        self._prefetched_on: Dict[str, date] = {}
+        self._active_jobs: Dict[str, str] = {}
+        # Failed attempts per target date (and the day they were counted on), and the next retry time
+        self._failures: Dict[str, Tuple[date, int]] = {}
+        self._retry_at: Dict[str, datetime] = {}
+        self._leader_lock = ProcessLock(lock_path)
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self):
+        if not self.windows:
+            logger.info("Prefetch scheduler disabled: no time windows configured")
+            return
+        self._task = asyncio.create_task(self._loop())
+        logger.info(f"🕑 Prefetch scheduler started for windows {settings.PREFETCH_WINDOWS}")
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        self._leader_lock.release()
+
+    def _is_leader(self) -> bool:
+        """Whether this process holds the scheduler lock, taking it if it is free.
+
+        Every API worker starts a scheduler, but only the lock holder submits jobs.
+        The OS releases the lock when its process exits, so another worker takes over.
+        """
+        if self._leader_lock.held:
+            return True
+        if not self._leader_lock.acquire():
+            return False
+        logger.info(f"🕑 Prefetch scheduler running in process {os.getpid()}")
+        return True
+
+    def in_window(self, now: datetime) -> bool:
+        current = now.time()
+        for start, end in self.windows:
+            if start <= end and start <= current < end:
+                return True
+            if start > end and (current >= start or current < end):
+                return True
+        return False
+
+    async def _loop(self):
+        while True:
+            try:
+                if self._is_leader():
+                    await self.run_once(datetime.now())
+            except Exception as e:
+                logger.error(f"Prefetch scheduler error: {str(e)}")
+            await asyncio.sleep(self.check_interval_seconds)
+
+    async def run_once(self, now: datetime):
+        """Submit prefetch jobs for recent dates not yet handled today, within the concurrency cap"""
+        await self._refresh_active_jobs(now)
+        if not self.in_window(now):
+            return
+
+        for offset in range(0 if self.include_today else 1, self.days_back + 1):
+            target_date = (now.date() - timedelta(days=offset)).isoformat()
+            if self._prefetched_on.get(target_date) == now.date() or target_date in self._active_jobs:
+                continue
+            if not self._may_attempt(target_date, now):
+                continue
+            if len(self._active_jobs) >= self.max_concurrent_jobs:
+                break
+
+            job = await self.job_service.submit("download_and_summarize", target_date)
+            self._active_jobs[target_date] = job.id
+            logger.info(f"🕑 Prefetching papers for {target_date} (job {job.id})")
+
+    def _may_attempt(self, target_date: str, now: datetime) -> bool:
+        """Whether a date that failed before is due for another attempt today"""
+        failed_on, failures = self._failures.get(target_date, (now.date(), 0))
+        if failed_on != now.date():
+            return True
+        if failures >= self.max_attempts_per_day:
+            return False
+        return now >= self._retry_at.get(target_date, now)
+
+    async def _refresh_active_jobs(self, now: datetime):
+        """Forget finished jobs; only a completed one marks its date as prefetched for today.
+
+        A date with no papers yet also counts as done for today. Failed jobs are
+        retried with exponential backoff, up to max_attempts_per_day.
+        """
+        today = now.date()
+        for target_date, job_id in list(self._active_jobs.items()):
+            job = await self.job_service.get(job_id)
+            if job and job.status in ACTIVE_STATUSES:
+                continue
+            del self._active_jobs[target_date]
+            if job and job.status == "completed":
+                self._prefetched_on[target_date] = today
+                self._failures.pop(target_date, None)
+                self._retry_at.pop(target_date, None)
+                if (job.result or {}).get("no_papers"):
+                    logger.info(f"🕑 No papers for {target_date} yet; not prefetching it again today")
+                continue
+
+            failed_on, failures = self._failures.get(target_date, (today, 0))
+            failures = failures + 1 if failed_on == today else 1
+            self._failures[target_date] = (today, failures)
+            if failures >= self.max_attempts_per_day:
+                logger.warning(f"🕑 Prefetch for {target_date} failed {failures} times; giving up until tomorrow")
+                continue
+            delay = self.retry_base_seconds * 2 ** (failures - 1)
+            self._retry_at[target_date] = now + timedelta(seconds=delay)
+            logger.warning(f"🕑 Prefetch for {target_date} did not complete; retrying in {delay:.0f}s")
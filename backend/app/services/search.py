@@ -0,0 +1,59 @@
+from datetime import date
+from typing import List, Optional
+
+from app.services.database import DatabaseService
+from app.config.config import settings
+from app.config.logging import logger
+
+
+class PaperSearchService:
+    """Service for finding papers by topic using the full-text index"""
+
+    def __init__(self, database_service: DatabaseService):
+        self.database_service = database_service
+
+    async def search_papers(
+        self,
+        query: str,
+        page: int = 1,
+        since: Optional[date] = None,
+        until: Optional[date] = None
+    ) -> tuple[List[int], str, int, int]:
+        """Search papers and describe one page of ranked results.
+
+        Pages before the first or after the last are clamped. Returns the paper
+        ids, the message, the page shown and the number of pages.
+        """
+        logger.info(f"Entered PaperSearchService.search_papers: {query!r}, page {page}")
+
+        page_size = settings.SEARCH_PAGE_SIZE
+        page = max(1, page)
+        results, total = await self.database_service.search_papers(
+            query, limit=page_size, offset=(page - 1) * page_size, since=since, until=until
+        )
+        if not results and page > 1:
+            # Past the last page; the empty result carries no total, so look it up
+            _, total = await self.database_service.search_papers(query, limit=1, offset=0, since=since, until=until)
+            page = max(1, (total + page_size - 1) // page_size)
+            if total:
+                results, total = await self.database_service.search_papers(
+                    query, limit=page_size, offset=(page - 1) * page_size, since=since, until=until
+                )
+
+        period = ""
+        if since and until:
+            period = f" on {since.isoformat()}" if since == until else f" between {since.isoformat()} and {until.isoformat()}"
+        elif since:
+            period = f" since {since.isoformat()}"
+
+        if not results:
+            return [], f"\n\nNo papers found matching *{query}*{period}.", 1, 0
+
+        pages = (total + page_size - 1) // page_size
+        response_msg = f"\n\nPapers matching *{query}*{period} (page {page} of {pages}, {total} found):"
+        for idx, (_, title, timestamp, _) in enumerate(results, start=1):
+            response_msg += f"\n{idx}. {title} ({timestamp:%Y-%m-%d})"
+        if page < pages:
+            response_msg += "\n\nAsk for the next page to see more."
+
+        return [paper_id for paper_id, _, _, _ in results], response_msg, page, pages
@@ -0,0 +1,46 @@
+# services/session_service.py
+import time
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+
+class SessionStore:
+    """SQLite-backed record of chat sessions, shared by every API worker process"""
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS sessions (
+                session_id TEXT PRIMARY KEY,
+                thread_id INTEGER NOT NULL,
+                created_at REAL NOT NULL,
+                last_seen_at REAL NOT NULL
+            )
+        """)
+        self._conn.commit()
+
+    def touch(self, session_id: str, thread_id: int):
+        now = time.time()
+        with self._lock:
+            self._conn.execute("""
+                INSERT INTO sessions (session_id, thread_id, created_at, last_seen_at)
+                VALUES (?, ?, ?, ?)
+                ON CONFLICT (session_id) DO UPDATE SET last_seen_at = excluded.last_seen_at
+            """, (session_id, thread_id, now, now))
+            self._conn.commit()
+
+    def get(self, session_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT session_id, thread_id, created_at, last_seen_at FROM sessions WHERE session_id = ?",
+                (session_id,)
+            ).fetchone()
+        if not row:
+            return None
+        return dict(zip(("session_id", "thread_id", "created_at", "last_seen_at"), row))
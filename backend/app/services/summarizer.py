@@ -1,29 +1,188 @@
 # services/summary_service.py
 import json
+import time
+import asyncio
 import aiofiles
+import numpy as np
+from contextlib import contextmanager
+from collections import defaultdict
 from datetime import datetime
 from pathlib import Path
-from typing import Dict, List, Any, Tuple
+from typing import Dict, List, Any, Tuple, Optional
 from app.services.llm import LLMService
+from app.services.llm_scheduler import Priority
 from app.services.database import DatabaseService, Paper
+from app.services.embeddings import EmbeddingService
+from app.services.downloader import DownloaderService
 from app.config.logging import logger
-from app.utils.utils import extract_text
-from langchain_core.messages import HumanMessage, SystemMessage
-from langchain_core.prompts import ChatPromptTemplate
-from app.utils.utils import retrieve_prompt
+from app.config.config import settings
+from app.utils.utils import extract_paper_text, text_cache, file_sha256, prompt_version
+from app.utils.utils import get_prompt_template
+from app.utils.sections import DETAILED_SUMMARY_SECTIONS, METADATA_SECTIONS, select_content
+from app.utils.progress import ProgressCallback, ProgressReporter
+from app.utils.singleflight import CoveringFlight
+from app.utils.batching import MicroBatcher
+
+# Why _process_pdf reused a stored summary instead of creating one
+REUSED_CURRENT = "current"
+REUSED_DUPLICATE = "duplicate"
+
+
+def _non_empty(value: Any) -> bool:
+    return isinstance(value, str) and value.strip() not in ("", "None")
+
+
+def _batch_key(paper_id: Any) -> str:
+    """Normalize a paper id so the id we sent matches the one echoed back.
+
+    The model may return an arXiv id as a JSON number, which drops trailing
+    zeros (2501.12340 becomes 2501.1234), so both sides are normalized the same way.
+    """
+    key = str(paper_id).strip()
+    if key.replace(".", "", 1).isdigit() and "." in key:
+        key = key.rstrip("0").rstrip(".")
+    return key
+
+
+class NoPapersError(FileNotFoundError):
+    """No downloaded papers for the requested date"""
+
+
+class StageTimings:
+    """Cumulative wall-clock time spent in each summarization stage"""
+
+    STAGES = ("extract", "llm", "db")
+
+    def __init__(self):
+        self.stages: Dict[str, float] = defaultdict(float)
+        self.started = time.perf_counter()
+        self.first_result: Optional[float] = None
+        self.total = 0.0
+
+    def mark_result(self):
+        """Record the time to the first finished paper"""
+        if self.first_result is None:
+            self.first_result = time.perf_counter() - self.started
+
+    def finish(self):
+        self.total = time.perf_counter() - self.started
+
+    @contextmanager
+    def measure(self, stage: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.stages[stage] += time.perf_counter() - start
+
+    def as_dict(self) -> Dict[str, float]:
+        timings = {stage: round(self.stages.get(stage, 0.0), 2) for stage in self.STAGES}
+        timings["first_result"] = round(self.first_result, 2) if self.first_result is not None else None
+        timings["total"] = round(self.total, 2)
+        return timings
+
+    def describe(self) -> str:
+        timings = self.as_dict()
+        stages = ", ".join(f"{stage} {timings[stage]:.1f}s" for stage in self.STAGES)
+        description = f"Total {timings['total']:.1f}s (cumulative per stage: {stages})"
+        if timings["first_result"] is not None:
+            description += f", first summary after {timings['first_result']:.1f}s"
+        return description
+
 
 class SummaryService:
     """Service for creating paper summaries"""
+
+    SUMMARY_PROMPTS = ("create_paper_metadata.txt", "create_paper_metadata_batch.txt", "create_detailed_summary.txt")
+    METADATA_FIELDS = ("title", "abstract", "key_findings", "methodology", "significance")
     
-    def __init__(self, llm_service: LLMService, database_service: DatabaseService, base_papers_dir: Path = Path("papers"), base_summaries_dir: Path = Path("summaries")):
+    def __init__(self, llm_service: LLMService, database_service: DatabaseService, base_papers_dir: Path = Path("papers"), base_summaries_dir: Path = Path("summaries"), embedding_service: Optional[EmbeddingService] = None):
         self.llm_service = llm_service
         self.database_service = database_service
+        # Optional; without it near-duplicates are not detected
+        self.embedding_service = embedding_service
         self.base_papers_dir = base_papers_dir
         self.base_summaries_dir = base_summaries_dir
+
+        self._extract_semaphore = asyncio.Semaphore(settings.SUMMARY_EXTRACT_CONCURRENCY)
+        self._llm_semaphore = asyncio.Semaphore(settings.SUMMARY_LLM_CONCURRENCY)
+        self._db_semaphore = asyncio.Semaphore(settings.SUMMARY_DB_CONCURRENCY)
+        # One run per date across chat, jobs and prefetch; see _run_for_date
+        self._date_runs = CoveringFlight("summaries")
+        # Papers waiting for metadata at the same time share one LLM request
+        self._metadata_batcher = MicroBatcher(
+            self._create_paper_metadata_batch, settings.METADATA_BATCH_SIZE, settings.METADATA_BATCH_WAIT_SECONDS
+        )
+        # Finished papers are buffered and upserted together
+        self._paper_writer = MicroBatcher(
+            self._save_paper_batch, settings.DB_WRITE_BATCH_SIZE, settings.DB_WRITE_BATCH_WAIT_SECONDS
+        )
     
-    async def summarize_papers_for_date(self, target_date: str) -> Tuple[List[Dict[str, Any]], str]:
-        """Summarize all papers for a given date"""
+    async def summarize_papers_for_date(
+        self,
+        target_date: str,
+        pipelined: Optional[bool] = None,
+        force: bool = False,
+        progress_callback: Optional[ProgressCallback] = None
+    ) -> Tuple[List[Dict[str, Any]], str]:
+        """Summarize all papers for a given date, reusing up-to-date summaries unless force is set"""
         logger.info("Entered SummaryService.summarize_papers_for_date")
+        return await self._run_for_date(
+            target_date, force, False,
+            self._summarize_papers_for_date, target_date, pipelined, force, progress_callback
+        )
+
+    async def download_and_summarize_papers(
+        self,
+        target_date: str,
+        downloader_service: DownloaderService,
+        force: bool = False,
+        progress_callback: Optional[ProgressCallback] = None
+    ) -> Tuple[List[Dict[str, Any]], str]:
+        """Download papers for a date and summarize each one as soon as it is on disk"""
+        logger.info("Entered SummaryService.download_and_summarize_papers")
+        return await self._run_for_date(
+            target_date, force, True,
+            self._download_and_summarize_papers, target_date, downloader_service, force, progress_callback
+        )
+
+    async def _run_for_date(self, target_date: str, force: bool, downloads: bool, func, *args):
+        """Run at most one summarization per date, whichever path asked for it.
+
+        A request joins the in-flight run for its date when that run does at
+        least as much (a forced run covers a normal one, a downloading run
+        covers a summarize-only one); otherwise it waits for the run to finish
+        and then starts its own, so a force request supersedes a normal run.
+        """
+        needs = {name for name, wanted in (("force", force), ("download", downloads)) if wanted}
+        return await self._date_runs.do(target_date, needs, func, *args)
+
+    async def _download_and_summarize_papers(
+        self,
+        target_date: str,
+        downloader_service: DownloaderService,
+        force: bool,
+        progress_callback: Optional[ProgressCallback]
+    ) -> Tuple[List[Dict[str, Any]], str]:
+        pdf_queue = asyncio.Queue(maxsize=settings.SUMMARY_QUEUE_SIZE)
+        producer = asyncio.create_task(downloader_service.stream_papers(target_date, pdf_queue, progress_callback))
+        try:
+            result = await self.summarize_papers_from_queue(
+                target_date, pdf_queue, force=force, progress_callback=progress_callback
+            )
+            logger.info(await producer)
+        except BaseException:
+            producer.cancel()
+            raise
+        return result
+
+    async def _summarize_papers_for_date(
+        self,
+        target_date: str,
+        pipelined: Optional[bool],
+        force: bool,
+        progress_callback: Optional[ProgressCallback]
+    ) -> Tuple[List[Dict[str, Any]], str]:
         
         date_folder = target_date.replace("-", "")
         papers_folder = self.base_papers_dir / date_folder
@@ -31,45 +190,234 @@ class SummaryService:
         summaries_folder.mkdir(exist_ok=True)
         
         if not papers_folder.exists():
-            raise FileNotFoundError(f"No papers folder found for date {target_date}")
+            raise NoPapersError(f"No papers folder found for date {target_date}")
         
         pdf_files = list(papers_folder.glob("*.pdf"))
         if not pdf_files:
-            raise FileNotFoundError(f"No PDF files found for {target_date}")
-        
-        summaries = []
-        processed_summary_ids = []
-        processed_count = 0
-        
-        for pdf_file in pdf_files:
+            raise NoPapersError(f"No PDF files found for {target_date}")
+
+        if pipelined is None:
+            pipelined = settings.SUMMARY_PIPELINED
+
+        timings = StageTimings()
+        version = self._summary_version()
+        progress = ProgressReporter(progress_callback, "paper_summarized", total=len(pdf_files))
+
+        async def process(pdf_file: Path):
             try:
-                print(f"Processing {pdf_file.name}...")
-                
-                text_content = await extract_text(pdf_file)
-                paper_model = await self._create_paper_summary_and_save_to_db(
-                    text_content, pdf_file.stem, papers_folder, summaries_folder, target_date
-                )
-
-                processed_summary_ids.append(paper_model.id)
-                summaries.append({
-                    "title": paper_model.title,
-                    "abstract": paper_model.abstract
-                })
-                processed_count += 1
-                
-            except Exception as e:
-                print(f"Error processing {pdf_file.name}: {str(e)}")
+                result = await self._process_pdf(pdf_file, papers_folder, summaries_folder, target_date, timings, version, force)
+            except Exception:
+                progress.advance(pdf_file.stem, ok=False)
+                raise
+            progress.advance(pdf_file.stem)
+            return result
+
+        if pipelined:
+            # Every paper runs through the stages independently; the per-stage
+            # semaphores bound how many papers are in each stage at once.
+            results = await asyncio.gather(
+                *(process(pdf_file) for pdf_file in pdf_files),
+                return_exceptions=True
+            )
+        else:
+            results = []
+            for pdf_file in pdf_files:
+                try:
+                    results.append(await process(pdf_file))
+                except Exception as e:
+                    results.append(e)
+
+        if self.embedding_service:
+            await self.embedding_service.flush()
+        return self._build_response(target_date, pdf_files, results, timings)
+
+    async def summarize_papers_from_queue(
+        self,
+        target_date: str,
+        pdf_queue: asyncio.Queue,
+        force: bool = False,
+        progress_callback: Optional[ProgressCallback] = None
+    ) -> Tuple[List[Dict[str, Any]], str]:
+        """Summarize PDFs as they arrive on a queue, until a None sentinel is received.
+
+        The queue is expected to be bounded so a slow summarizer holds back the producer.
+        """
+        logger.info("Entered SummaryService.summarize_papers_from_queue")
+
+        date_folder = target_date.replace("-", "")
+        papers_folder = self.base_papers_dir / date_folder
+        summaries_folder = self.base_summaries_dir / date_folder
+        summaries_folder.mkdir(parents=True, exist_ok=True)
+
+        timings = StageTimings()
+        version = self._summary_version()
+        pdf_files: List[Path] = []
+        results: List[Any] = []
+        # The total is unknown until the producer is done
+        progress = ProgressReporter(progress_callback, "paper_summarized")
+
+        async def worker():
+            while True:
+                pdf_file = await pdf_queue.get()
+                if pdf_file is None:
+                    # Leave the sentinel for the other workers
+                    await pdf_queue.put(None)
+                    return
+                try:
+                    result = await self._process_pdf(pdf_file, papers_folder, summaries_folder, target_date, timings, version, force)
+                except Exception as e:
+                    result = e
+                progress.advance(pdf_file.stem, ok=not isinstance(result, Exception))
+                pdf_files.append(pdf_file)
+                results.append(result)
+
+        await asyncio.gather(*(worker() for _ in range(settings.SUMMARY_STREAM_WORKERS)))
+
+        if self.embedding_service:
+            await self.embedding_service.flush()
+        return self._build_response(target_date, pdf_files, results, timings)
+
+    def _build_response(
+        self,
+        target_date: str,
+        pdf_files: List[Path],
+        results: List[Any],
+        timings: "StageTimings"
+    ) -> Tuple[List[Dict[str, Any]], str]:
+        """Collect processed paper ids and the chat response from per-paper results"""
+        timings.finish()
+        
+        created: List[Tuple[Path, Paper]] = []
+        reused: List[Tuple[Path, Paper, str]] = []
+
+        for pdf_file, result in zip(pdf_files, results):
+            if isinstance(result, BaseException):
+                logger.error(f"Error processing {pdf_file.name}: {str(result)}")
                 continue
+
+            paper_model, reuse = result
+            if reuse:
+                reused.append((pdf_file, paper_model, reuse))
+            else:
+                created.append((pdf_file, paper_model))
+        
+        logger.info(f"Summarization timings for {target_date}: {timings.as_dict()}")
+        logger.info(f"Extracted text cache: {text_cache.stats()}")
+
+        # Numbering continues across both lists so positions match the returned ids
+        processed_summary_ids = [paper.id for _, paper in created] + [paper.id for _, paper, _ in reused]
+        processed_count = len(processed_summary_ids)
         
         response_msg = f"✅ Successfully summarized **{processed_count}** papers for *{target_date}*!"
 
-        if processed_count > 0:
+        if created:
             response_msg += "\n\n**Summaries created:**\n"
             response_msg += "\n".join(
-                [f"{i+1}. {summary['title']}" for i, summary in enumerate(summaries)]
+                [f"{i+1}. {paper.title}" for i, (_, paper) in enumerate(created)]
         )
+
+        if reused:
+            response_msg += f"\n\n♻️ **Reused {len(reused)} existing summaries:**\n"
+            lines = []
+            for i, (pdf_file, paper, reuse) in enumerate(reused, start=len(created) + 1):
+                if reuse == REUSED_DUPLICATE:
+                    lines.append(f"{i}. {pdf_file.stem} (near-duplicate of *{paper.title}*)")
+                else:
+                    lines.append(f"{i}. {paper.title} (up to date)")
+            response_msg += "\n".join(lines)
+
+        response_msg += f"\n\n⏱️ {timings.describe()}"
         
         return processed_summary_ids, response_msg
+
+    async def _process_pdf(
+        self,
+        pdf_file: Path,
+        papers_folder: Path,
+        summaries_folder: Path,
+        target_date: str,
+        timings: "StageTimings",
+        version: str,
+        force: bool = False
+    ) -> Tuple[Paper, Optional[str]]:
+        """Run a single PDF through extraction, LLM summarization and the database write.
+
+        Returns the paper and, when an existing summary was reused instead of
+        creating one, REUSED_CURRENT or REUSED_DUPLICATE.
+        """
+        logger.info(f"Processing {pdf_file.name}...")
+
+        content_hash = await asyncio.to_thread(file_sha256, pdf_file)
+
+        if not force:
+            existing = await self._find_current_summary(pdf_file, content_hash, version)
+            if existing:
+                logger.info(f"⏭️ Skipping (summary up to date): {pdf_file.name}")
+                timings.mark_result()
+                return existing, REUSED_CURRENT
+
+        async with self._extract_semaphore:
+            with timings.measure("extract"):
+                text_content = await extract_paper_text(pdf_file, content_hash=content_hash)
+
+        abstract_vector = None
+        if self.embedding_service:
+            abstract_vector, duplicate = await self._find_near_duplicate(pdf_file, text_content, force)
+            if duplicate:
+                timings.mark_result()
+                return duplicate, REUSED_DUPLICATE
+
+        paper_model = await self._create_paper_summary_and_save_to_db(
+            text_content, pdf_file.stem, papers_folder, summaries_folder, target_date, timings,
+            content_hash=content_hash, prompt_version=version
+        )
+        if abstract_vector is not None:
+            self.embedding_service.add(paper_model.id, abstract_vector)
+        timings.mark_result()
+        return paper_model, None
+
+    async def _find_near_duplicate(
+        self,
+        pdf_file: Path,
+        text_content: str,
+        force: bool
+    ) -> Tuple[Optional[np.ndarray], Optional[Paper]]:
+        """Embed the paper's abstract and return the stored paper it nearly duplicates, if any.
+
+        The same work often reappears on later days under a slightly different
+        title; reusing its summary saves the LLM calls.
+        """
+        try:
+            vector = await self.embedding_service.embed_paper(text_content)
+        except Exception as e:
+            logger.error(f"Embedding {pdf_file.name} failed, not checking for duplicates: {e!r}")
+            return None, None
+
+        match = None if force else self.embedding_service.nearest(vector)
+        if not match or match[1] < settings.DUPLICATE_SIMILARITY_THRESHOLD:
+            return vector, None
+
+        paper_id, similarity = match
+        existing = await self.database_service.get_paper_by_id(paper_id)
+        # The same PDF with outdated prompts is being refreshed, not duplicated
+        if not existing or existing.paper_path == str(pdf_file):
+            return vector, None
+
+        logger.info(f"⏭️ Skipping near-duplicate of '{existing.title}' (similarity {similarity:.3f}): {pdf_file.name}")
+        return vector, existing
+
+    async def _find_current_summary(self, pdf_file: Path, content_hash: str, version: str) -> Optional[Paper]:
+        """Return the stored paper for this PDF if its summary matches the content and prompts"""
+        async with self._db_semaphore:
+            existing = await self.database_service.get_paper_by_path(str(pdf_file))
+
+        if not existing:
+            return None
+        if existing.content_hash != content_hash or existing.prompt_version != version:
+            return None
+        if not Path(existing.summary_path).exists():
+            return None
+        return existing
     
     async def _create_paper_summary_and_save_to_db(
         self, 
@@ -77,15 +425,22 @@ class SummaryService:
         paper_title: str, 
         papers_folder: Path,
         summaries_folder: Path,
-        target_date: str
+        target_date: str,
+        timings: Optional["StageTimings"] = None,
+        content_hash: Optional[str] = None,
+        prompt_version: Optional[str] = None
     ) -> Paper:
         """Create paper summary, save markdown file, and save metadata to database"""
         logger.info("Entered _create_paper_summary_and_save_to_db")
+        timings = timings or StageTimings()
 
-        metadata_dict = await self._create_paper_metadata(text_content, paper_title)
-        detailed_summary = await self._create_detailed_summary(
-            text_content, metadata_dict['title']
-        )
+        # Metadata and detailed summary only depend on the paper content, so both
+        # LLM calls are issued together.
+        with timings.measure("llm"):
+            metadata_dict, detailed_summary = await asyncio.gather(
+                self._request_paper_metadata(text_content, paper_title),
+                self._limited_llm_call(self._create_detailed_summary(text_content, paper_title))
+            )
         
         # Save detailed summary as markdown
         summary_md_filename = f"{paper_title}_detailed_summary.md"
@@ -106,27 +461,129 @@ class SummaryService:
             significance=metadata_dict['significance'],
             paper_path=str(papers_folder / f"{paper_title}.pdf"),
             summary_path=str(summary_md_path),  # Store markdown file path
-            timestamp=datetime.strptime(target_date, "%Y-%m-%d")
+            timestamp=datetime.strptime(target_date, "%Y-%m-%d"),
+            content_hash=content_hash,
+            prompt_version=prompt_version
         )
         
         # Save to database
-        paper_id = await self.database_service.save_paper(paper_model)
+        with timings.measure("db"):
+            paper_id = await self._save_paper(paper_model)
         paper_model.id = paper_id
         logger.info(f"Saved paper model: {paper_model}")
         
         return paper_model
+
+    async def _save_paper(self, paper: Paper) -> int:
+        """Save one paper, through the write buffer when batching is enabled"""
+        if settings.DB_WRITE_BATCH_SIZE > 1:
+            return await self._paper_writer.submit(paper)
+        async with self._db_semaphore:
+            return await self.database_service.save_paper(paper)
+
+    async def _save_paper_batch(self, papers: List[Paper]) -> List[Any]:
+        """Upsert buffered papers in one transaction.
+
+        If the bulk write fails, papers are retried one by one so a single bad
+        row only fails its own summary.
+        """
+        async with self._db_semaphore:
+            try:
+                return await self.database_service.save_papers(papers)
+            except Exception as e:
+                logger.error(f"Bulk save of {len(papers)} papers failed, saving individually: {e!r}")
+
+            results: List[Any] = []
+            for paper in papers:
+                try:
+                    results.append(await self.database_service.save_paper(paper))
+                except Exception as paper_error:
+                    results.append(paper_error)
+            return results
+
+    async def _limited_llm_call(self, coro):
+        """Await an LLM coroutine while holding a slot of the LLM stage"""
+        async with self._llm_semaphore:
+            return await coro
     
+    async def _request_paper_metadata(self, text_content: str, paper_title: str) -> Dict[str, Any]:
+        """Get metadata for one paper, through the batcher when batching is enabled"""
+        if settings.METADATA_BATCH_SIZE > 1:
+            # The batch handler takes the LLM slot, so waiting for a batch does not hold one
+            return await self._metadata_batcher.submit((text_content, paper_title))
+        return await self._limited_llm_call(self._create_paper_metadata(text_content, paper_title))
+
+    def _summary_version(self) -> str:
+        """Version of the prompts and of the content selection that feeds them"""
+        selection = json.dumps({
+            "metadata": [settings.METADATA_TOKEN_BUDGET, METADATA_SECTIONS],
+            "detailed_summary": [settings.DETAILED_SUMMARY_TOKEN_BUDGET, DETAILED_SUMMARY_SECTIONS],
+        }, sort_keys=True)
+        return prompt_version(*self.SUMMARY_PROMPTS, config=selection)
+
+    def _metadata_content(self, text_content: str) -> str:
+        return select_content(text_content, settings.METADATA_TOKEN_BUDGET, METADATA_SECTIONS)
+
+    async def _create_paper_metadata_batch(self, papers: List[Tuple[str, str]]) -> List[Any]:
+        """Create metadata for several papers in one LLM request.
+
+        Papers missing from the response, or with missing or empty metadata
+        values, fall back to individual requests.
+        """
+        logger.info(f"Entered _create_paper_metadata_batch with {len(papers)} papers")
+        if len(papers) == 1:
+            return [await self._limited_llm_call(self._create_paper_metadata(*papers[0]))]
+
+        prompt = get_prompt_template("create_paper_metadata_batch.txt")
+        human_content = "\n\n".join(
+            f"### Paper {paper_title}\n{self._metadata_content(text_content)}"
+            for text_content, paper_title in papers
+        )
+
+        by_paper_id: Dict[str, Dict[str, Any]] = {}
+        try:
+            response = await self._limited_llm_call(
+                self.llm_service.generate_response(prompt.format_messages(input=human_content), priority=Priority.BATCH)
+            )
+            parsed = json.loads(response.content.strip())
+            if isinstance(parsed, list):
+                by_paper_id = {
+                    _batch_key(item.get("paper_id")): item for item in parsed
+                    if self._valid_metadata(item)
+                }
+        except json.JSONDecodeError:
+            logger.info("JSONDecodeError in batched metadata, falling back to single requests")
+        except Exception as e:
+            logger.error(f"Batched metadata request failed, falling back to single requests: {str(e)}")
+
+        async def metadata_for(text_content: str, paper_title: str) -> Dict[str, Any]:
+            metadata = by_paper_id.get(_batch_key(paper_title))
+            if metadata is not None:
+                return {field: metadata[field] for field in self.METADATA_FIELDS}
+            return await self._limited_llm_call(self._create_paper_metadata(text_content, paper_title))
+
+        return await asyncio.gather(
+            *(metadata_for(text_content, paper_title) for text_content, paper_title in papers),
+            return_exceptions=True
+        )
+
+    def _valid_metadata(self, item: Any) -> bool:
+        """Whether a batched response item has usable values for every field"""
+        if not isinstance(item, dict):
+            return False
+        findings = item.get("key_findings")
+        if not isinstance(findings, list) or not findings or not all(_non_empty(finding) for finding in findings):
+            return False
+        return all(_non_empty(item.get(field)) for field in self.METADATA_FIELDS if field != "key_findings")
+
     async def _create_paper_metadata(self, text_content: str, paper_title: str) -> Dict[str, Any]:
         """Create structured metadata from paper content"""
         logger.info("Entered _create_paper_metadata")
 
-        system_prompt_content = retrieve_prompt("create_paper_metadata.txt")
-        prompt = ChatPromptTemplate.from_messages([
-            SystemMessage(content=system_prompt_content),
-            HumanMessage(content=f"Content:\n{text_content[:3000]}")
-        ])
+        prompt = get_prompt_template("create_paper_metadata.txt")
+        human_content = f"Content:\n{self._metadata_content(text_content)}"
         
-        response = await self.llm_service.generate_response(prompt.format_messages())
+        response = await self.llm_service.generate_response(prompt.format_messages(input=human_content), priority=Priority.BATCH)
         
         try:
             return json.loads(response.content.strip())
@@ -144,11 +601,9 @@ class SummaryService:
     async def _create_detailed_summary(self, text_content: str, title: str) -> str:
         """Create detailed summary from paper content"""
 
-        system_prompt_content = retrieve_prompt("create_detailed_summary.txt")
-        prompt = ChatPromptTemplate.from_messages([
-            SystemMessage(content=system_prompt_content),
-            HumanMessage(content=f"Paper: {title}\n\nContent:\n{text_content[:4000]}")
-        ])
+        prompt = get_prompt_template("create_detailed_summary.txt")
+        content = select_content(text_content, settings.DETAILED_SUMMARY_TOKEN_BUDGET, DETAILED_SUMMARY_SECTIONS)
+        human_content = f"Paper: {title}\n\nContent:\n{content}"
         
-        response = await self.llm_service.generate_response(prompt.format_messages())
+        response = await self.llm_service.generate_response(prompt.format_messages(input=human_content), priority=Priority.BATCH)
         return response.content
\ No newline at end of file
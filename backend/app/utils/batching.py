@@ -0,0 +1,63 @@
+import asyncio
+from typing import Any, Awaitable, Callable, Generic, List, Optional, Set, Tuple, TypeVar
+
+from app.config.logging import logger
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+
+class MicroBatcher(Generic[T, R]):
+    """Groups items submitted concurrently into batches processed by a single handler call.
+
+    A batch is flushed once it reaches max_size or when max_wait_seconds have
+    passed since its first item. The handler returns one result per item, in
+    order; an exception instance in the results fails only that item.
+    """
+
+    def __init__(self, handler: Callable[[List[T]], Awaitable[List[Any]]], max_size: int, max_wait_seconds: float):
+        self.handler = handler
+        self.max_size = max_size
+        self.max_wait_seconds = max_wait_seconds
+        self._pending: List[Tuple[T, asyncio.Future]] = []
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._tasks: Set[asyncio.Task] = set()
+
+    async def submit(self, item: T) -> R:
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((item, future))
+
+        if len(self._pending) >= self.max_size:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.max_wait_seconds, self._flush)
+        return await future
+
+    def _flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._pending = self._pending, []
+        if not batch:
+            return
+        task = asyncio.create_task(self._run(batch))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _run(self, batch: List[Tuple[T, asyncio.Future]]):
+        try:
+            results = await self.handler([item for item, _ in batch])
+            if len(results) != len(batch):
+                raise ValueError(f"Batch handler returned {len(results)} results for {len(batch)} items")
+        except Exception as e:
+            logger.error(f"Batch of {len(batch)} items failed: {e!r}")
+            results = [e] * len(batch)
+
+        for (_, future), result in zip(batch, results):
+            if future.done():
+                continue
+            if isinstance(result, BaseException):
+                future.set_exception(result)
+            else:
+                future.set_result(result)
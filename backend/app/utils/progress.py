@@ -0,0 +1,28 @@
+from typing import Any, Callable, Dict, Optional
+
+from app.config.logging import logger
+
+ProgressCallback = Callable[[Dict[str, Any]], None]
+
+
+class ProgressReporter:
+    """Counts finished items of a batch and forwards progress events to an optional callback"""
+
+    def __init__(self, callback: Optional[ProgressCallback], event: str, total: Optional[int] = None):
+        self.callback = callback
+        self.event = event
+        self.total = total
+        self.completed = 0
+
+    def advance(self, item: str, ok: bool = True):
+        self.completed += 1
+        self.emit(self.event, completed=self.completed, total=self.total, item=item, ok=ok)
+
+    def emit(self, event: str, **fields: Any):
+        if self.callback is None:
+            return
+        try:
+            self.callback({"event": event, **fields})
+        except Exception as e:
+            # Progress reporting must never break the work being reported on
+            logger.warning(f"Progress callback failed: {e!r}")
@@ -0,0 +1,77 @@
+import hashlib
+import threading
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, Optional
+
+from langchain_core.messages import SystemMessage
+from langchain_core.prompts import ChatPromptTemplate
+
+from app.config.logging import logger
+
+# Resolved from the package so prompts load regardless of the working directory
+PROMPTS_DIR = Path(__file__).resolve().parent.parent / "prompts"
+
+
+@dataclass
+class PromptEntry:
+    text: str
+    mtime_ns: int
+    version: str
+    template: ChatPromptTemplate
+
+
+class PromptRegistry:
+    """Prompt files read once and kept with a pre-built chat template.
+
+    An entry is reloaded when its file's modification time changes, so prompt
+    edits take effect without a restart.
+    """
+
+    def __init__(self, prompts_dir: Path = PROMPTS_DIR):
+        self.prompts_dir = Path(prompts_dir)
+        self._entries: Dict[str, PromptEntry] = {}
+        self._lock = threading.Lock()
+
+    def _load(self, name: str, mtime_ns: int) -> PromptEntry:
+        text = (self.prompts_dir / name).read_text(encoding="utf-8")
+        digest = hashlib.sha256(name.encode("utf-8"))
+        digest.update(text.encode("utf-8"))
+        # The system prompt is fixed; only the human turn is filled in per call
+        template = ChatPromptTemplate.from_messages([
+            SystemMessage(content=text),
+            ("human", "{input}")
+        ])
+        return PromptEntry(text=text, mtime_ns=mtime_ns, version=digest.hexdigest()[:16], template=template)
+
+    def _entry(self, name: str) -> PromptEntry:
+        mtime_ns = (self.prompts_dir / name).stat().st_mtime_ns
+        entry: Optional[PromptEntry] = self._entries.get(name)
+        if entry is not None and entry.mtime_ns == mtime_ns:
+            return entry
+        with self._lock:
+            entry = self._entries.get(name)
+            if entry is None or entry.mtime_ns != mtime_ns:
+                if entry is not None:
+                    logger.info(f"🔄 Reloading changed prompt {name}")
+                entry = self._load(name, mtime_ns)
+                self._entries[name] = entry
+        return entry
+
+    def text(self, name: str) -> str:
+        return self._entry(name).text
+
+    def version(self, name: str) -> str:
+        return self._entry(name).version
+
+    def template(self, name: str) -> ChatPromptTemplate:
+        return self._entry(name).template
+
+    def load_all(self) -> int:
+        """Load every prompt file up front so a missing prompt fails at startup"""
+        for path in sorted(self.prompts_dir.glob("*.txt")):
+            self._entry(path.name)
+        return len(self._entries)
+
+
+prompt_registry = PromptRegistry()
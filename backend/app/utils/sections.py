@@ -0,0 +1,117 @@
+import re
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from app.utils.tokens import count_tokens
+
+# Canonical section names and the headings that introduce them
+SECTION_HEADINGS: Dict[str, Sequence[str]] = {
+    "abstract": ("abstract", "summary"),
+    "introduction": ("introduction", "background", "motivation", "introduction and background"),
+    "method": ("method", "methods", "methodology", "approach", "our approach", "proposed method",
+               "proposed method/approach", "model", "framework"),
+    "results": ("results", "experiments", "experimental results", "evaluation", "experiments and results",
+                "findings", "results and analysis"),
+    "conclusion": ("conclusion", "conclusions", "discussion", "discussion and conclusion",
+                   "discussion and implications", "limitations", "key findings"),
+}
+REFERENCE_HEADINGS = ("references", "bibliography", "acknowledgements", "acknowledgments")
+
+# Optional markdown hashes or bold and section numbering ("3", "3.1", "III."), then the heading itself,
+# so the same splitter works on extracted papers and on the generated markdown summaries
+_NUMBERING = r"^[ \t]*(?:#{1,6}[ \t]*)?(?:\*\*)?(?:(?:\d+(?:\.\d+)*|[IVX]+)\.?[ \t]+)?"
+
+def _heading_pattern(headings: Sequence[str]) -> "re.Pattern[str]":
+    names = "|".join(sorted((re.escape(h).replace(r"\ ", r"\s+") for h in headings), key=len, reverse=True))
+    # Headings sit on their own line; "Abstract" may also run into its text ("Abstract—We ...")
+    return re.compile(_NUMBERING + rf"({names})(?:\*\*)?[ \t]*(?:$|[:.][ \t]+|[—–][ \t]*)", re.IGNORECASE | re.MULTILINE)
+
+_SECTION_PATTERNS = {name: _heading_pattern(headings) for name, headings in SECTION_HEADINGS.items()}
+_REFERENCES_PATTERN = _heading_pattern(REFERENCE_HEADINGS)
+
+# Share of the token budget each section gets when selecting content for a prompt
+METADATA_SECTIONS = {"abstract": 0.4, "introduction": 0.2, "results": 0.2, "conclusion": 0.2}
+DETAILED_SUMMARY_SECTIONS = {"abstract": 0.2, "introduction": 0.15, "method": 0.25, "results": 0.25, "conclusion": 0.15}
+LINKEDIN_SECTIONS = {"abstract": 0.4, "results": 0.3, "conclusion": 0.3}
+
+
+def find_references(text: str) -> Optional[int]:
+    """Offset of the references heading, or None when the text has none"""
+    match = _REFERENCES_PATTERN.search(text)
+    return match.start() if match else None
+
+
+def split_sections(text: str) -> Dict[str, str]:
+    """Split extracted paper text into canonical sections.
+
+    Text before the first recognised heading is kept as "preamble" (title and
+    authors, and often an unlabelled abstract). The first occurrence of each
+    section wins, so running headers repeated on later pages are ignored.
+    """
+    references = find_references(text)
+    if references is not None:
+        text = text[:references]
+
+    starts: List[Tuple[int, int, str]] = []
+    for name, pattern in _SECTION_PATTERNS.items():
+        match = pattern.search(text)
+        if match:
+            starts.append((match.start(), match.end(), name))
+    starts.sort()
+
+    sections: Dict[str, str] = {}
+    preamble_end = starts[0][0] if starts else len(text)
+    if text[:preamble_end].strip():
+        sections["preamble"] = text[:preamble_end].strip()
+    for index, (_, body_start, name) in enumerate(starts):
+        body_end = starts[index + 1][0] if index + 1 < len(starts) else len(text)
+        body = text[body_start:body_end].strip()
+        if body:
+            sections[name] = body
+    return sections
+
+
+def truncate_to_tokens(text: str, max_tokens: int) -> str:
+    """Cut text to at most max_tokens, preferring to end on a sentence boundary"""
+    if max_tokens <= 0:
+        return ""
+    if count_tokens(text) <= max_tokens:
+        return text
+    # Start from the ~4 characters per token estimate and shrink until it fits
+    end = min(len(text), max_tokens * 4)
+    while end > 0 and count_tokens(text[:end]) > max_tokens:
+        end = int(end * 0.9)
+    cut = text[:end]
+    sentence_end = cut.rfind(". ")
+    if sentence_end > len(cut) // 2:
+        cut = cut[:sentence_end + 1]
+    return cut
+
+
+def select_content(text: str, token_budget: int, weights: Dict[str, float]) -> str:
+    """Pick the most useful sections of a paper within a token budget.
+
+    Each section gets its weighted share of the budget; budget a section does
+    not use (because it is short or missing) passes to the sections after it.
+    Without recognisable headings this falls back to the start of the text.
+    """
+    sections = split_sections(text)
+    # An unlabelled abstract usually sits in the preamble
+    if "abstract" not in sections and "preamble" in sections and len(sections) > 1:
+        sections["abstract"] = sections["preamble"]
+    wanted = [name for name in weights if name in sections]
+    if not wanted:
+        return truncate_to_tokens(text, token_budget)
+
+    parts = []
+    remaining = token_budget
+    remaining_weight = sum(weights[name] for name in wanted)
+    for name in wanted:
+        share = int(remaining * weights[name] / remaining_weight) if remaining_weight else remaining
+        remaining_weight -= weights[name]
+        chunk = truncate_to_tokens(sections[name], share)
+        if not chunk:
+            continue
+        part = f"[{name.title()}]\n{chunk}"
+        parts.append(part)
+        remaining -= count_tokens(part)
+    return "\n\n".join(parts)
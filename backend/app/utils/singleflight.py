@@ -0,0 +1,116 @@
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, FrozenSet, Hashable, Iterable, Tuple
+
+from app.config.logging import logger
+
+
+class _SharedTasks:
+    """Tracks how many callers await each shared task"""
+
+    def __init__(self):
+        self._waiters: Dict[asyncio.Task, int] = {}
+
+    async def _wait(self, task: asyncio.Task) -> Any:
+        """Await a shared task; the last waiter to be cancelled cancels the task too"""
+        self._waiters[task] = self._waiters.get(task, 0) + 1
+        try:
+            return await asyncio.shield(task)
+        except asyncio.CancelledError:
+            if self._waiters[task] == 1 and not task.done():
+                task.cancel()
+            raise
+        finally:
+            self._waiters[task] -= 1
+            if not self._waiters[task]:
+                del self._waiters[task]
+
+
+class SingleFlight(_SharedTasks):
+    """Runs concurrent calls for the same key as one shared task.
+
+    Callers that arrive while a task for their key is in flight await that task
+    instead of starting their own, and all of them receive its result or
+    exception. A cancelled caller leaves the task running for the others; it is
+    cancelled once every caller has been.
+    """
+
+    def __init__(self, name: str = "singleflight"):
+        super().__init__()
+        self.name = name
+        self._tasks: Dict[Hashable, asyncio.Task] = {}
+        self.shared_calls = 0
+
+    async def do(self, key: Hashable, func: Callable[..., Awaitable[Any]], *args: Any, **kwargs: Any) -> Any:
+        task = self._tasks.get(key)
+        if task is None:
+            task = asyncio.create_task(func(*args, **kwargs))
+            self._tasks[key] = task
+            task.add_done_callback(lambda done, key=key: self._forget(key, done))
+        else:
+            self.shared_calls += 1
+            logger.info(f"🔗 {self.name}: joining in-flight call for {key}")
+        return await self._wait(task)
+
+    def _forget(self, key: Hashable, task: asyncio.Task):
+        if self._tasks.get(key) is task:
+            del self._tasks[key]
+        # Retrieve the exception so an unawaited failure is not reported as never retrieved
+        if not task.cancelled():
+            task.exception()
+
+    def in_flight(self) -> int:
+        return len(self._tasks)
+
+
+class CoveringFlight(_SharedTasks):
+    """Single-flight where a call only joins an in-flight task that does all it needs.
+
+    Each call names what it needs (e.g. {"force"}) and a started task provides
+    exactly that. A caller whose needs are covered by the in-flight task for its
+    key joins it; otherwise it waits for that task to finish and then starts its
+    own, so at most one task per key runs at a time. As with SingleFlight, the
+    task is cancelled once every caller awaiting it has been.
+    """
+
+    def __init__(self, name: str = "coveringflight"):
+        super().__init__()
+        self.name = name
+        self._tasks: Dict[Hashable, Tuple[asyncio.Task, FrozenSet[str]]] = {}
+        self.shared_calls = 0
+
+    async def do(
+        self,
+        key: Hashable,
+        needs: Iterable[str],
+        func: Callable[..., Awaitable[Any]],
+        *args: Any,
+        **kwargs: Any
+    ) -> Any:
+        needs = frozenset(needs)
+        while True:
+            entry = self._tasks.get(key)
+            if entry is None:
+                task = asyncio.create_task(func(*args, **kwargs))
+                self._tasks[key] = (task, needs)
+                task.add_done_callback(lambda done, key=key: self._forget(key, done))
+                return await self._wait(task)
+
+            task, provides = entry
+            if needs <= provides:
+                self.shared_calls += 1
+                logger.info(f"🔗 {self.name}: joining in-flight call for {key}")
+                return await self._wait(task)
+
+            logger.info(f"🔗 {self.name}: waiting for in-flight call for {key} before running with {sorted(needs)}")
+            # asyncio.wait neither raises the task's exception nor cancels it
+            await asyncio.wait({task})
+
+    def _forget(self, key: Hashable, task: asyncio.Task):
+        entry = self._tasks.get(key)
+        if entry is not None and entry[0] is task:
+            del self._tasks[key]
+        if not task.cancelled():
+            task.exception()
+
+    def in_flight(self) -> int:
+        return len(self._tasks)
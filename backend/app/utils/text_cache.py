@@ -0,0 +1,72 @@
+import os
+import hashlib
+from pathlib import Path
+from typing import Dict, Optional
+
+from app.config.logging import logger
+
+
+class ExtractedTextCache:
+    """On-disk cache of extracted PDF text with size-based LRU eviction"""
+
+    def __init__(self, cache_dir: Path, max_bytes: int):
+        self.cache_dir = Path(cache_dir)
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def make_key(content_hash: str, *parts) -> str:
+        """Build a cache key from the PDF content hash and the extraction parameters"""
+        raw = "|".join([content_hash, *(str(part) for part in parts)])
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def _path(self, key: str) -> Path:
+        return self.cache_dir / f"{key}.txt"
+
+    def get(self, key: str) -> Optional[str]:
+        path = self._path(key)
+        try:
+            text = path.read_text(encoding="utf-8")
+        except FileNotFoundError:
+            self.misses += 1
+            return None
+        # Touch the entry so eviction drops the least recently used files first
+        os.utime(path, None)
+        self.hits += 1
+        return text
+
+    def put(self, key: str, text: str):
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        path = self._path(key)
+        tmp_path = path.with_suffix(".tmp")
+        tmp_path.write_text(text, encoding="utf-8")
+        os.replace(tmp_path, path)
+        self._evict()
+
+    def _evict(self):
+        entries = []
+        total = 0
+        for entry in os.scandir(self.cache_dir):
+            if entry.is_file() and entry.name.endswith(".txt"):
+                stat = entry.stat()
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+                total += stat.st_size
+
+        if total <= self.max_bytes:
+            return
+
+        for _, size, path in sorted(entries):
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                continue
+            total -= size
+            self.evictions += 1
+            if total <= self.max_bytes:
+                break
+        logger.info(f"🧹 Text cache evicted down to {total} bytes")
+
+    def stats(self) -> Dict[str, int]:
+        return {"hits": self.hits, "misses": self.misses, "evictions": self.evictions}
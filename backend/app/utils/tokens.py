@@ -0,0 +1,16 @@
+_token_encoding = None
+
+
+def count_tokens(text: str) -> int:
+    """Count tokens with tiktoken, or estimate them when the encoding is unavailable"""
+    global _token_encoding
+    if _token_encoding is None:
+        try:
+            import tiktoken
+            _token_encoding = tiktoken.get_encoding("cl100k_base")
+        except Exception:
+            # Loading the encoding may need network access; fall back to ~4 characters per token
+            _token_encoding = False
+    if _token_encoding:
+        return len(_token_encoding.encode(text, disallowed_special=()))
+    return (len(text) + 3) // 4
@@ -1,19 +1,130 @@
 # services/pdf_service.py
+import os
+import asyncio
+import hashlib
 import PyPDF2
 from pathlib import Path
+from typing import Optional
+from concurrent.futures import ProcessPoolExecutor
+from langchain_core.prompts import ChatPromptTemplate
+from app.config.config import settings
+from app.utils.text_cache import ExtractedTextCache
+from app.utils.prompts import prompt_registry
+from app.utils.sections import find_references
 
-async def extract_text(pdf_path: Path) -> str:
-    """Extract text from PDF file"""
-    text = ""
+# Bump whenever the extraction logic changes so cached text is re-extracted
+EXTRACTOR_VERSION = "3"
+
+text_cache = ExtractedTextCache(Path(settings.TEXT_CACHE_DIR), settings.TEXT_CACHE_MAX_MB * 1024 * 1024)
+
+_extraction_pool: Optional[ProcessPoolExecutor] = None
+
+def _get_extraction_pool() -> ProcessPoolExecutor:
+    """Lazily create the process pool used for PDF parsing"""
+    global _extraction_pool
+    if _extraction_pool is None:
+        _extraction_pool = ProcessPoolExecutor(max_workers=settings.PDF_EXTRACT_WORKERS or os.cpu_count())
+    return _extraction_pool
+
+def shutdown_extraction_pool():
+    """Stop the PDF extraction worker processes"""
+    global _extraction_pool
+    if _extraction_pool is not None:
+        _extraction_pool.shutdown(cancel_futures=True)
+        _extraction_pool = None
+
+def _extract_text_sync(
+    pdf_path: str,
+    max_pages: Optional[int] = None,
+    max_chars: Optional[int] = None,
+    stop_at_references: bool = False
+) -> str:
+    """Parse a PDF in the current process, stopping early at the page or character limit.
+
+    With stop_at_references the pages after the reference list are not parsed,
+    since none of the sections used for summaries come after it.
+    """
+    parts = []
+    length = 0
     try:
         with open(pdf_path, 'rb') as file:
             pdf_reader = PyPDF2.PdfReader(file)
-            for page in pdf_reader.pages:
-                text += page.extract_text() + "\n"
+            for page_number, page in enumerate(pdf_reader.pages):
+                if max_pages is not None and page_number >= max_pages:
+                    break
+                page_text = (page.extract_text() or "") + "\n"
+                # The first page can carry a table of contents, so only look from the second on
+                references = find_references(page_text) if stop_at_references and page_number > 0 else None
+                if references is not None:
+                    parts.append(page_text[:references])
+                    break
+                parts.append(page_text)
+                length += len(page_text)
+                if max_chars is not None and length >= max_chars:
+                    break
     except Exception as e:
         print(f"Error extracting text from {pdf_path}: {str(e)}")
+    text = "".join(parts)
+    return text[:max_chars] if max_chars is not None else text
+
+def file_sha256(path: Path) -> str:
+    """Hash a file's content in chunks"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as file:
+        for chunk in iter(lambda: file.read(1024 * 1024), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+async def extract_text(
+    pdf_path: Path,
+    max_pages: Optional[int] = None,
+    max_chars: Optional[int] = None,
+    content_hash: Optional[str] = None,
+    stop_at_references: bool = False
+) -> str:
+    """Extract text from PDF file in a worker process so the event loop stays responsive"""
+    cache_key = None
+    if settings.TEXT_CACHE_ENABLED:
+        content_hash = content_hash or await asyncio.to_thread(file_sha256, pdf_path)
+        cache_key = text_cache.make_key(content_hash, EXTRACTOR_VERSION, max_pages, max_chars, stop_at_references)
+        cached_text = await asyncio.to_thread(text_cache.get, cache_key)
+        if cached_text is not None:
+            return cached_text
+
+    loop = asyncio.get_running_loop()
+    text = await loop.run_in_executor(
+        _get_extraction_pool(), _extract_text_sync, str(pdf_path), max_pages, max_chars, stop_at_references
+    )
+
+    # Failed extractions come back empty and are not cached
+    if cache_key and text:
+        await asyncio.to_thread(text_cache.put, cache_key, text)
     return text
 
+async def extract_paper_text(pdf_path: Path, content_hash: Optional[str] = None) -> str:
+    """Extract a paper's text with the configured limits, sharing the text cache between callers"""
+    return await extract_text(
+        pdf_path,
+        max_pages=settings.PDF_EXTRACT_MAX_PAGES or None,
+        max_chars=settings.PDF_EXTRACT_MAX_CHARS or None,
+        content_hash=content_hash,
+        stop_at_references=settings.PDF_EXTRACT_STOP_AT_REFERENCES
+    )
+
 def retrieve_prompt(file_name: str) -> str:
-    with open("app/prompts/" + file_name, "r") as f:
-        return f.read()
\ No newline at end of file
+    return prompt_registry.text(file_name)
+
+def get_prompt_template(file_name: str) -> ChatPromptTemplate:
+    """Pre-built template for a prompt file; fill the human turn with format_messages(input=...)"""
+    return prompt_registry.template(file_name)
+
+def prompt_version(*file_names: str, config: str = "") -> str:
+    """Short hash identifying the current content of the given prompt files.
+
+    config describes any other settings that change what the prompts are given.
+    """
+    digest = hashlib.sha256()
+    for file_name in file_names:
+        digest.update(prompt_registry.version(file_name).encode("utf-8"))
+    digest.update(config.encode("utf-8"))
+    return digest.hexdigest()[:16]
\ No newline at end of file
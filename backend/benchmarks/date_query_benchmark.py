@@ -0,0 +1,104 @@
+"""Compare the old DATE(timestamp) filter with the half-open range scan.
+
+Seeds a scratch schema with synthetic papers, then prints the query plan and
+latency of both queries before and after the timestamp index migration.
+
+    cd backend && python -m benchmarks.date_query_benchmark --rows 1000000
+"""
+import argparse
+import asyncio
+import statistics
+import time
+from datetime import date
+
+import asyncpg
+
+from app.services.database import DATABASE_URL
+from app.services.migrations import MIGRATIONS, run_migrations
+
+SCHEMA = "bench_date_query"
+
+OLD_QUERY = """
+    SELECT * FROM papers
+    WHERE DATE(timestamp) = $1
+    ORDER BY timestamp DESC
+"""
+
+NEW_QUERY = """
+    SELECT * FROM papers
+    WHERE timestamp >= $1::date::timestamptz
+      AND timestamp < ($1::date + 1)::timestamptz
+    ORDER BY timestamp DESC
+"""
+
+# One paper every 90 seconds: about 960 per day, 1M rows span roughly three years
+SEED_SQL = """
+    INSERT INTO papers (title, abstract, key_findings, methodology, significance,
+                        paper_path, summary_path, timestamp)
+    SELECT 'Paper ' || g, 'Abstract of paper ' || g, '["finding"]'::jsonb, 'method', 'significance',
+           'papers/' || g || '.pdf', 'summaries/' || g || '.md',
+           timestamptz '2023-01-01 00:00:00+00' + g * interval '90 seconds'
+    FROM generate_series(1, $1) AS g
+"""
+
+
+async def measure(conn, query: str, target: date, runs: int):
+    plan = await conn.fetch(f"EXPLAIN (ANALYZE, BUFFERS) {query}", target)
+    latencies = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        rows = await conn.fetch(query, target)
+        latencies.append((time.perf_counter() - start) * 1000)
+    latencies.sort()
+    return {
+        "rows": len(rows),
+        "median_ms": statistics.median(latencies),
+        "p95_ms": latencies[int(len(latencies) * 0.95) - 1] if len(latencies) > 1 else latencies[0],
+        "plan": [row[0] for row in plan],
+    }
+
+
+def report(label: str, result: dict):
+    print(f"\n=== {label}: {result['rows']} rows, median {result['median_ms']:.2f} ms, p95 {result['p95_ms']:.2f} ms")
+    for line in result["plan"]:
+        print(f"    {line}")
+
+
+async def main(args):
+    admin = await asyncpg.connect(args.dsn)
+    await admin.execute(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE")
+    await admin.execute(f"CREATE SCHEMA {SCHEMA}")
+    await admin.close()
+
+    conn = await asyncpg.connect(args.dsn, server_settings={"search_path": SCHEMA})
+    try:
+        # Schema as it was before the index migration
+        await run_migrations(conn, [m for m in MIGRATIONS if m.version < 3])
+        print(f"Seeding {args.rows:,} papers into {SCHEMA}...")
+        start = time.perf_counter()
+        await conn.execute(SEED_SQL, args.rows)
+        await conn.execute("ANALYZE papers")
+        print(f"Seeded in {time.perf_counter() - start:.1f}s")
+
+        target = date.fromisoformat(args.date)
+        report("DATE(timestamp), no index", await measure(conn, OLD_QUERY, target, args.runs))
+        report("range scan, no index", await measure(conn, NEW_QUERY, target, args.runs))
+
+        await run_migrations(conn)
+        await conn.execute("ANALYZE papers")
+        report("DATE(timestamp), with index", await measure(conn, OLD_QUERY, target, args.runs))
+        report("range scan, with index", await measure(conn, NEW_QUERY, target, args.runs))
+    finally:
+        if not args.keep:
+            await conn.execute(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE")
+        await conn.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--dsn", default=DATABASE_URL)
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--runs", type=int, default=20)
+    parser.add_argument("--date", default="2024-06-15", help="Day to query (YYYY-MM-DD)")
+    parser.add_argument("--keep", action="store_true", help="Keep the scratch schema afterwards")
+    asyncio.run(main(parser.parse_args()))
@@ -1,25 +1,32 @@
 from fastapi import FastAPI, HTTPException
+from fastapi.responses import StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
 from contextlib import asynccontextmanager
 import asyncio
+import json
 import uuid
 from typing import Dict
+from datetime import datetime
 import logging
 
-from agent import ChatBotAgent
+from agent import ChatBotAgent, session_id_to_int
+from app.config.config import settings
+from app.services.sessions import SessionStore
+from app.services.scheduler import PrefetchScheduler
 
 # Import your existing agent class
 # from your_agent_module import ChatBotAgent
 
-# Global agent instance and session storage
+# Global agent instance and session storage shared by all worker processes
 agent = None
-sessions: Dict[str, str] = {}
+scheduler = None
+sessions = SessionStore(settings.SESSION_DB_PATH)
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """Lifespan context manager for startup and shutdown events"""
-    global agent
+    global agent, scheduler
     
     # Startup
     try:
@@ -30,10 +37,16 @@ async def lifespan(app: FastAPI):
     except Exception as e:
         logging.error(f"Failed to initialize agent: {e}")
         raise e
+
+    scheduler = PrefetchScheduler(agent.job_service)
+    scheduler.start()
     
     yield
     
     # Shutdown
+    if scheduler:
+        await scheduler.stop()
+
     if agent:
         try:
             await agent.cleanup()
@@ -65,6 +78,11 @@ class ChatResponse(BaseModel):
     response: str
     session_id: str
 
+class JobRequest(BaseModel):
+    kind: str = "download_and_summarize"  # download, summarize or download_and_summarize
+    target_date: str
+    force: bool = False
+
 @app.post("/chat", response_model=ChatResponse)
 async def chat_endpoint(request: ChatRequest):
     """
@@ -83,7 +101,7 @@ async def chat_endpoint(request: ChatRequest):
             session_id = request.session_id
         
         # Store session (optional: implement session management logic here)
-        sessions[session_id] = session_id
+        await asyncio.to_thread(sessions.touch, session_id, session_id_to_int(session_id))
         
         # Process the user input through your existing agent
         response_text = await agent.process_user_input(request.message, session_id)
@@ -97,16 +115,89 @@ async def chat_endpoint(request: ChatRequest):
         logging.error(f"Error processing chat request: {e}")
         raise HTTPException(status_code=500, detail=f"Error processing request: {str(e)}")
 
+@app.post("/chat/stream")
+async def chat_stream_endpoint(request: ChatRequest):
+    """
+    Streaming chat endpoint returning newline-delimited JSON events:
+    node progress, LLM tokens as they are generated, and the final response
+    """
+    global agent
+    
+    if not agent:
+        raise HTTPException(status_code=500, detail="Agent not initialized")
+
+    session_id = request.session_id or str(uuid.uuid4())
+    await asyncio.to_thread(sessions.touch, session_id, session_id_to_int(session_id))
+
+    async def event_stream():
+        # Sent immediately so the client sees the first byte before any LLM work
+        yield json.dumps({"type": "start", "session_id": session_id}) + "\n"
+        try:
+            async for event in agent.process_user_input_stream(request.message, session_id):
+                yield json.dumps({**event, "session_id": session_id}, default=str) + "\n"
+        except Exception as e:
+            logging.error(f"Error processing streaming chat request: {e}")
+            yield json.dumps({"type": "error", "detail": f"Error processing request: {str(e)}", "session_id": session_id}) + "\n"
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="application/x-ndjson",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@app.post("/jobs")
+async def submit_job(request: JobRequest):
+    """Submit a background download/summarize job; identical active jobs are reused"""
+    if not agent:
+        raise HTTPException(status_code=500, detail="Agent not initialized")
+
+    try:
+        datetime.strptime(request.target_date, "%Y-%m-%d")
+        job = await agent.job_service.submit(request.kind, request.target_date, force=request.force)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return job
+
+@app.get("/jobs/{job_id}")
+async def get_job(job_id: str):
+    """Get the status and progress of a background job"""
+    if not agent:
+        raise HTTPException(status_code=500, detail="Agent not initialized")
+
+    job = await agent.job_service.get(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+@app.post("/jobs/{job_id}/cancel")
+async def cancel_job(job_id: str):
+    """Cancel a queued or running background job"""
+    if not agent:
+        raise HTTPException(status_code=500, detail="Agent not initialized")
+
+    job = await agent.job_service.cancel(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
 @app.get("/health")
 async def health_check():
     """Health check endpoint"""
     return {"status": "healthy", "message": "ChatBot API is running"}
 
+@app.get("/metrics")
+async def metrics():
+    """LLM admission queue depth and wait times, endpoint health and cache counters"""
+    if not agent:
+        raise HTTPException(status_code=500, detail="Agent not initialized")
+    return agent.metrics()
+
 @app.get("/sessions/{session_id}")
 async def get_session(session_id: str):
     """Get session information (optional endpoint for session management)"""
-    if session_id in sessions:
-        return {"session_id": session_id, "active": True}
+    session = await asyncio.to_thread(sessions.get, session_id)
+    if session:
+        return {**session, "active": True}
     else:
         raise HTTPException(status_code=404, detail="Session not found")
 
@@ -116,6 +207,8 @@ if __name__ == "__main__":
         "main:app",  # Replace with your actual file name
         host="0.0.0.0",
         port=8000,
-        reload=True,
+        # Reloading only works with a single worker process
+        reload=settings.API_WORKERS == 1,
+        workers=settings.API_WORKERS,
         log_level="info"
     )
\ No newline at end of file
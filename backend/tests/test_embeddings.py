@@ -0,0 +1,133 @@
+import asyncio
+from pathlib import Path
+from types import SimpleNamespace
+
+import numpy as np
+
+from app.services.embeddings import EmbeddingService, EmbeddingStore, HashingEmbedder
+from app.services.summarizer import SummaryService
+
+PAPER_TEXT = "Abstract\nWe train sparse mixture-of-experts language models with a new routing loss.\n\n1 Introduction\nRouting matters."
+OTHER_TEXT = "Abstract\nA benchmark of robot grasping policies in cluttered kitchens.\n\n1 Introduction\nRobots grasp things."
+
+
+def embed(*texts: str) -> np.ndarray:
+    return asyncio.run(HashingEmbedder().embed(list(texts)))
+
+
+def test_add_appends_new_papers_and_replaces_existing_ones():
+    store = EmbeddingStore()
+    first, second, third = embed("sparse experts", "robot grasping", "protein folding")
+
+    store.add([1, 2], np.stack([first, second]))
+    store.add([2, 3], np.stack([third, first]))
+
+    assert store.ids == [1, 2, 3]
+    assert store.matrix.shape == (3, 512)
+    np.testing.assert_allclose(store.vector(2), third / np.linalg.norm(third), rtol=1e-6)
+    np.testing.assert_allclose(store.vector(3), first / np.linalg.norm(first), rtol=1e-6)
+
+
+def test_add_keeps_the_last_vector_for_an_id_repeated_in_one_call():
+    store = EmbeddingStore()
+    first, second, third = embed("sparse experts", "robot grasping", "protein folding")
+    store.add([1], first[None, :])
+
+    store.add([2, 2, 1], np.stack([first, second, third]))
+
+    assert store.ids == [1, 2]
+    np.testing.assert_allclose(store.vector(2), second / np.linalg.norm(second), rtol=1e-6)
+    np.testing.assert_allclose(store.vector(1), third / np.linalg.norm(third), rtol=1e-6)
+
+
+def test_top_k_ranks_by_similarity_and_honours_exclude():
+    store = EmbeddingStore()
+    store.add([1, 2, 3], embed("sparse mixture of experts", "sparse mixture of experts routing", "robot grasping"))
+    query = embed("sparse mixture of experts")
+
+    assert [paper_id for paper_id, _ in store.top_k(query, 2)[0]] == [1, 2]
+    matches = store.top_k(query, 3, exclude=[1])[0]
+    assert [paper_id for paper_id, _ in matches] == [2, 3]
+    assert store.top_k(query, 0) == [[]]
+
+
+def test_write_and_load_round_trip(tmp_path: Path):
+    path = tmp_path / "embeddings.npz"
+    store = EmbeddingStore(path, "hashing:512")
+    store.add([1, 2], embed("sparse experts", "robot grasping"))
+    store.save()
+
+    loaded = EmbeddingStore(path, "hashing:512")
+    assert loaded.load()
+    assert loaded.ids == [1, 2]
+    np.testing.assert_allclose(loaded.matrix, store.matrix)
+
+
+def test_load_ignores_a_file_from_another_embedder(tmp_path: Path):
+    path = tmp_path / "embeddings.npz"
+    store = EmbeddingStore(path, "hashing:512")
+    store.add([1], embed("sparse experts"))
+    store.save()
+
+    other = EmbeddingStore(path, "ollama:nomic-embed-text")
+    assert not other.load()
+    assert len(other) == 0
+
+
+def test_write_merges_rows_written_by_another_process(tmp_path: Path):
+    path = tmp_path / "embeddings.npz"
+    first_worker = EmbeddingStore(path, "hashing:512")
+    second_worker = EmbeddingStore(path, "hashing:512")
+    first_worker.add([1, 2], embed("sparse experts", "robot grasping"))
+    first_worker.save()
+
+    second_worker.add([2, 3], embed("protein folding", "graph networks"))
+    second_worker.save()
+
+    merged = EmbeddingStore(path, "hashing:512")
+    assert merged.load()
+    assert sorted(merged.ids) == [1, 2, 3]
+    # The latest writer wins for papers both workers embedded
+    np.testing.assert_allclose(merged.vector(2), second_worker.vector(2))
+    assert 1 in second_worker
+
+
+class FakeDatabase:
+    def __init__(self, papers):
+        self.papers = papers
+
+    async def get_paper_by_id(self, paper_id):
+        return self.papers.get(paper_id)
+
+
+def near_duplicate(pdf_file: str, text: str, force: bool = False):
+    async def run():
+        database = FakeDatabase({1: SimpleNamespace(id=1, title="Sparse Experts", paper_path="papers/20250101/a.pdf")})
+        embedding_service = EmbeddingService(database, HashingEmbedder(), EmbeddingStore(embedder_name="hashing:512"))
+        embedding_service.add(1, await embedding_service.embed_paper(PAPER_TEXT))
+        summary_service = SummaryService(None, database, embedding_service=embedding_service)
+        return await summary_service._find_near_duplicate(Path(pdf_file), text, force)
+
+    return asyncio.run(run())
+
+
+def test_near_duplicate_from_another_pdf_is_reused():
+    vector, duplicate = near_duplicate("papers/20250102/b.pdf", PAPER_TEXT)
+    assert vector is not None
+    assert duplicate.id == 1
+
+
+def test_same_pdf_is_not_its_own_duplicate():
+    _, duplicate = near_duplicate("papers/20250101/a.pdf", PAPER_TEXT)
+    assert duplicate is None
+
+
+def test_force_skips_the_duplicate_check():
+    vector, duplicate = near_duplicate("papers/20250102/b.pdf", PAPER_TEXT, force=True)
+    assert vector is not None
+    assert duplicate is None
+
+
+def test_different_paper_is_not_a_duplicate():
+    _, duplicate = near_duplicate("papers/20250102/b.pdf", OTHER_TEXT)
+    assert duplicate is None
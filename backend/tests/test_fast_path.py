@@ -0,0 +1,26 @@
+from datetime import date
+
+from app.services.fast_path import FastPathClassifier
+
+TODAY = date(2025, 3, 12)
+
+
+def classify(text: str):
+    return FastPathClassifier().classify(text, TODAY)
+
+
+def test_post_creation_requests_use_the_fast_path():
+    for text in ("create a linkedin post for paper 2", "write a post about the second paper", "make me a post for #2"):
+        assert classify(text) == ("create_linkedin_from_position", {"paper_position": "2"})
+
+
+def test_post_as_part_of_a_word_is_not_a_post_request():
+    assert classify("What does paper 2 say about post-training?") is None
+    assert classify("is paper 2 a post-hoc analysis") is None
+
+
+def test_summarize_request_for_a_date():
+    assert classify("summarize papers from 2025-03-10") == (
+        "summarize_papers",
+        {"year": "2025", "month": "03", "day": "10", "date_description": "2025-03-10", "force": "false"},
+    )